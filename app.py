@@ -1,7 +1,10 @@
 # app.py
 from fastapi import FastAPI
 from routes import api_router  # ✅ Import the central router from `routes/__init__.py`
+from backend.job_queue import start_workers
+from backend.providers import warm_up
 import logging
+import os
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -11,6 +14,17 @@ app = FastAPI(title="RFP Automation API", version="1.0")
 # ✅ Include all API routes
 app.include_router(api_router)
 
+# ✅ Start background job workers (resumes jobs interrupted by a restart)
+@app.on_event("startup")
+def start_job_workers():
+    start_workers()
+
+# ✅ Clients are created lazily; optionally warm them in the background so startup isn't delayed
+@app.on_event("startup")
+def warm_clients():
+    if os.getenv("PRELOAD_CLIENTS", "0") == "1":
+        warm_up(background=True)
+
 @app.get("/")
 def root():
     return {"message": "Welcome to the RFP Automation API"}
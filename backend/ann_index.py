@@ -0,0 +1,189 @@
+# backend/ann_index.py
+
+"""
+IVF (inverted file) approximate-nearest-neighbour index over the local vector store.
+
+Live vectors are clustered with spherical k-means into `nlist` lists; a query
+scores the centroids, then exact-scores only the rows in the `nprobe` closest
+lists. `nprobe` trades recall for latency. Inserts are assigned to their nearest
+centroid as they arrive, deletes reuse the store's tombstones, and the centroids
+and list assignments are saved next to the vectors (`ivf.npz`).
+Below IVF_MIN_TRAIN_VECTORS live vectors the index is untrained and search stays exact.
+"""
+
+import logging
+import math
+import os
+
+import numpy as np
+
+from backend.vector_store import LocalVectorStore, top_k_indices
+
+IVF_NLIST = int(os.getenv("IVF_NLIST", 0))  # 0 = about 4 * sqrt(vectors)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+IVF_MIN_TRAIN_VECTORS = int(os.getenv("IVF_MIN_TRAIN_VECTORS", 10000))
+IVF_TRAIN_SAMPLE = int(os.getenv("IVF_TRAIN_SAMPLE", 100000))
+IVF_RETRAIN_GROWTH = 4.0  # retrain once the store is this many times larger than at training
+IVF_SAVE_EVERY = 10000  # unsaved assignments before ivf.npz is rewritten
+ASSIGN_BATCH = 65536
+
+
+def assign_to_centroids(data: np.ndarray, centroids: np.ndarray, spherical: bool = True) -> np.ndarray:
+    """Nearest centroid per row: max inner product (spherical) or min L2 distance."""
+    centroid_norms = None if spherical else (centroids ** 2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), ASSIGN_BATCH):
+        scores = np.asarray(data[start:start + ASSIGN_BATCH], dtype=np.float32) @ centroids.T
+        if spherical:
+            out[start:start + ASSIGN_BATCH] = scores.argmax(axis=1)
+        else:
+            out[start:start + ASSIGN_BATCH] = (centroid_norms - 2 * scores).argmin(axis=1)
+    return out
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, spherical: bool = True, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; spherical mode keeps centroids unit length (cosine). Returns (k, dim) centroids."""
+    data = np.asarray(data, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign_to_centroids(data, centroids, spherical)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=k)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+        sums = np.add.reduceat(data[order], starts[nonempty], axis=0)
+        centroids[nonempty] = sums / counts[nonempty, None]
+        # Re-seed empty clusters from random points
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class IVFVectorStore(LocalVectorStore):
+    """LocalVectorStore with IVF search. Same Pinecone-compatible API; tune `nprobe` per instance."""
+
+    def __init__(self, *args, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                 min_train_vectors: int = IVF_MIN_TRAIN_VECTORS, **kwargs):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_vectors = min_train_vectors
+        self._centroids = None
+        super().__init__(*args, **kwargs)
+        self._ivf_path = os.path.join(self.path, "ivf.npz")
+        self._load_ivf()
+
+    # --- training / assignment ---------------------------------------------------
+
+    def train(self, nlist: int = None):
+        """(Re)cluster the live vectors and rebuild every inverted list."""
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            if not len(live):
+                return
+            nlist = nlist or self.nlist or max(1, int(4 * math.sqrt(len(live))))
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(live, min(len(live), max(IVF_TRAIN_SAMPLE, nlist * 40)), replace=False))
+            self._centroids = kmeans(self._matrix[sample], nlist)
+            self._trained_rows = len(live)
+            self._assign_all()
+            logging.info(f"✅ Trained IVF index: {len(self._centroids)} lists over {len(live)} vectors")
+
+    def _assign_all(self):
+        self._assignment = assign_to_centroids(self._matrix, self._centroids)
+        self._rebuild_lists()
+        self.save()
+
+    def _rebuild_lists(self):
+        order = np.argsort(self._assignment, kind="stable")
+        bounds = np.searchsorted(self._assignment[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        self._pending = [[] for _ in self._centroids]  # rows appended since the lists were built
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        if self._pending[list_id]:
+            self._lists[list_id] = np.concatenate([self._lists[list_id], self._pending[list_id]])
+            self._pending[list_id] = []
+        return self._lists[list_id]
+
+    # --- persistence -------------------------------------------------------------
+
+    def save(self):
+        """Write centroids and list assignments to ivf.npz."""
+        with self._lock:
+            if self._centroids is None:
+                return
+            tmp = self._ivf_path + ".tmp.npz"
+            np.savez(tmp, centroids=self._centroids, assignment=self._assignment,
+                     trained_rows=self._trained_rows, generation=self._meta_generation())
+            os.replace(tmp, self._ivf_path)
+            self._unsaved = 0
+
+    def _load_ivf(self):
+        self._centroids = None
+        self._unsaved = 0
+        if os.path.exists(self._ivf_path):
+            saved = np.load(self._ivf_path)
+            self._centroids = saved["centroids"]
+            self._trained_rows = int(saved["trained_rows"])
+            assignment = saved["assignment"]
+            if int(saved["generation"]) == self._meta_generation() and len(assignment) <= len(self._ids):
+                # Rows upserted after the last save only need their nearest centroid
+                tail = assign_to_centroids(self._matrix[len(assignment):], self._centroids)
+                self._assignment = np.concatenate([assignment, tail])
+                self._rebuild_lists()
+                self._unsaved = len(tail)
+            else:
+                self._assign_all()
+            logging.info(f"✅ Loaded IVF index: {len(self._centroids)} lists")
+        elif self._alive.sum() >= self.min_train_vectors:
+            self.train()
+
+    # --- store hooks -------------------------------------------------------------
+
+    def _on_upsert(self, first_row: int, matrix: np.ndarray):
+        if self._centroids is None:
+            if self._alive.sum() >= self.min_train_vectors:
+                self.train()
+            return
+        if self._alive.sum() > IVF_RETRAIN_GROWTH * self._trained_rows:
+            self.train()
+            return
+        assignment = assign_to_centroids(matrix, self._centroids)
+        self._assignment = np.concatenate([self._assignment, assignment])
+        for offset, list_id in enumerate(assignment.tolist()):
+            self._pending[list_id].append(first_row + offset)
+        self._unsaved += len(assignment)
+        if self._unsaved >= IVF_SAVE_EVERY:
+            self.save()
+
+    def _on_reset(self):
+        # delete_all or compact(): row numbers changed, so reassign (or drop) the lists
+        if not len(self._ids):
+            self._centroids = None
+            if os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+        elif self._centroids is not None:
+            self._assign_all()
+
+    def _on_reload(self):
+        # The writer process saves ivf.npz under the new log generation; use it if it matches
+        self._load_ivf()
+
+    # --- search ------------------------------------------------------------------
+
+    def _search(self, query: np.ndarray, top_k: int):
+        if self._centroids is None:
+            return super()._search(query, top_k)
+        probes = top_k_indices(self._centroids @ query, self.nprobe)
+        rows = np.concatenate([self._list_rows(int(i)) for i in probes])
+        rows = rows[self._alive[rows]]
+        if not len(rows):
+            return [], []
+        scores = self._matrix[rows] @ query
+        best = top_k_indices(scores, top_k)
+        return rows[best].tolist(), scores[best].tolist()
@@ -0,0 +1,196 @@
+# backend/bm25_index.py
+
+"""
+In-process BM25 keyword index over the ingested chunks.
+
+Postings are compact `array` pairs (chunk row, term frequency) per term, so a
+query only touches the postings of its own terms. Query terms are capped to the
+rarest BM25_MAX_QUERY_TERMS, which keeps even a whole-RFP query sub-millisecond
+on typical corpora. Identifier-like tokens (SKU-1234, ISO-27001, 45.1) are indexed
+whole and by their parts, so exact terms match. Only ids and postings are held;
+chunk texts stay in the vector index.
+"""
+
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from backend.vector_store import top_k_indices
+
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "bm25_index.pkl")
+BM25_MAX_QUERY_TERMS = int(os.getenv("BM25_MAX_QUERY_TERMS", 32))
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMPACT_DEAD_FRACTION = 0.3
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_TOKEN_PARTS = re.compile(r"[-_./]")
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have if in into is it its may must no not of on or "
+    "our shall should such that the their then there these they this to was we were will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group(0)
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = _TOKEN_PARTS.split(token)
+        if len(parts) > 1:
+            tokens += [part for part in parts if part not in STOPWORDS]
+    return tokens
+
+
+class BM25Index:
+    """BM25 over chunk ids, with the same `delete(ids=..., delete_all=...)` call as the vector index."""
+
+    def __init__(self, path: str = BM25_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._load()
+
+    # --- persistence -----------------------------------------------------------
+
+    def _reset(self):
+        self._ids, self._row_of = [], {}
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._postings = {}  # term -> (array("I") rows, array("H") term frequencies)
+        self._live = 0
+        self._total_length = 0
+
+    def _load(self):
+        self._reset()
+        self._mtime = None
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            self._ids, self._lengths, self._alive, self._postings = (
+                state["ids"], state["lengths"], state["alive"], state["postings"]
+            )
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids) if self._alive[row]}
+            self._live = len(self._row_of)
+            self._total_length = sum(length for length, alive in zip(self._lengths, self._alive) if alive)
+            self._mtime = os.path.getmtime(self.path)
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"ids": self._ids, "lengths": self._lengths, "alive": self._alive,
+                             "postings": self._postings}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+
+    def reload_if_changed(self):
+        """Pick up an index rewritten by another process (e.g. the ingestion script)."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            with self._lock:
+                self._load()
+                logging.info(f"✅ Reloaded BM25 index: {self._live} chunks")
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._row_of
+
+    # --- updates ---------------------------------------------------------------
+
+    def add(self, ids: list, texts: list):
+        """Index (or re-index) chunks by id."""
+        with self._lock:
+            self._remove([doc_id for doc_id in ids if doc_id in self._row_of])
+            for doc_id, text in zip(ids, texts):
+                tokens = tokenize(text)
+                row = len(self._ids)
+                for term, tf in Counter(tokens).items():
+                    rows, tfs = self._postings.setdefault(term, (array("I"), array("H")))
+                    rows.append(row)
+                    tfs.append(min(tf, 65535))
+                self._ids.append(doc_id)
+                self._row_of[doc_id] = row
+                self._lengths.append(len(tokens))
+                self._alive.append(1)
+                self._live += 1
+                self._total_length += len(tokens)
+
+    def _remove(self, ids: list):
+        for doc_id in ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = 0
+                self._live -= 1
+                self._total_length -= self._lengths[row]
+
+    def delete(self, ids: list = None, delete_all: bool = False, namespace: str = None):
+        with self._lock:
+            if delete_all:
+                self._reset()
+                return
+            self._remove(ids or [])
+            if self._ids and 1 - self._live / len(self._ids) > COMPACT_DEAD_FRACTION:
+                self.compact()
+
+    def compact(self):
+        """Drop deleted chunks from every posting list and renumber rows."""
+        with self._lock:
+            alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            new_row = np.cumsum(alive) - 1
+            postings = {}
+            for term, (rows, tfs) in self._postings.items():
+                rows_np = np.frombuffer(rows, dtype=np.uint32)
+                keep = alive[rows_np]
+                if keep.any():
+                    postings[term] = (array("I", new_row[rows_np[keep]].astype(np.uint32).tobytes()),
+                                      array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()))
+            self._postings = postings
+            self._ids = [doc_id for doc_id, keep in zip(self._ids, alive) if keep]
+            self._lengths = array("I", np.frombuffer(self._lengths, dtype=np.uint32)[alive].tobytes())
+            self._alive = bytearray(b"\x01" * len(self._ids))
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+
+    # --- search ----------------------------------------------------------------
+
+    def query(self, text: str, top_k: int = 10) -> list:
+        """Top-k [(chunk_id, bm25_score)], best first."""
+        self.reload_if_changed()
+        with self._lock:
+            if not self._live:
+                return []
+            terms = [term for term in set(tokenize(text)) if term in self._postings]
+            # Long queries (a whole RFP) keep only their rarest, most informative terms
+            terms = sorted(terms, key=lambda term: len(self._postings[term][0]))[:BM25_MAX_QUERY_TERMS]
+            if not terms:
+                return []
+
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+            average_length = self._total_length / self._live
+            all_rows, all_scores = [], []
+            for term in terms:
+                rows, tfs = self._postings[term]
+                rows = np.frombuffer(rows, dtype=np.uint32)
+                tfs = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+                df = len(rows)
+                idf = math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average_length)
+                all_rows.append(rows)
+                all_scores.append(idf * tfs * (BM25_K1 + 1) / (tfs + norm))
+
+            rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(all_scores))
+            scores[np.frombuffer(self._alive, dtype=np.uint8)[rows] == 0] = -np.inf
+            best = top_k_indices(scores, min(top_k, int(np.isfinite(scores).sum())))
+            return [(self._ids[int(rows[i])], float(scores[i])) for i in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"chunks": self._live, "terms": len(self._postings)}
@@ -0,0 +1,136 @@
+# backend/chunker.py
+
+"""
+Token-aware, heading-aware chunking for the proposal index.
+
+Text is split into line units and packed into chunks of up to
+`chunk_tokens` tokens. A heading always starts a new chunk, and consecutive chunks
+within a section share about `overlap_tokens` tokens of trailing context. Each
+chunk records its source file, starting page, character offset and section.
+"""
+
+import os
+import re
+
+from backend.tokens import count_tokens
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 400))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", 60))
+
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+_NAMED_HEADING = re.compile(r"^(section|article|part|appendix|schedule)\s+[\w.]+", re.IGNORECASE)
+_NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\.?\s+[A-Z]")
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+MAX_HEADING_CHARS = 100
+
+
+def is_heading(line: str) -> bool:
+    """Markdown headings, "Section 3 ...", "2.1 Pricing" style titles and short ALL-CAPS lines."""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_CHARS or line.endswith((".", ",", ";")):
+        return False
+    if _MARKDOWN_HEADING.match(line) or _NAMED_HEADING.match(line) or _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 4 and all(c.isupper() for c in letters)
+
+
+def _split_long(text: str, max_tokens: int) -> list:
+    """Split one oversized unit at sentence, then word, boundaries."""
+    pieces, current = [], ""
+    for part in _SENTENCE_END.split(text):
+        candidate = f"{current} {part}".strip()
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+
+    result = []
+    for piece in pieces:
+        if count_tokens(piece) <= max_tokens:
+            result.append(piece)
+            continue
+        words = piece.split()
+        step = max(1, int(len(words) * max_tokens / count_tokens(piece)))
+        result += [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+    return result
+
+
+def _units(pages: list, chunk_tokens: int):
+    """Yield (text, page, offset, is_heading) for each non-empty line across the pages."""
+    offset = 0
+    for page_number, page_text in enumerate(pages, start=1):
+        for match in re.finditer(r"[^\n]+", page_text):
+            text = match.group(0).strip()
+            if not text:
+                continue
+            line_offset = offset + match.start()
+            if count_tokens(text) > chunk_tokens:
+                for piece in _split_long(text, chunk_tokens):
+                    yield piece, page_number, line_offset, False
+            else:
+                yield text, page_number, line_offset, is_heading(text)
+        offset += len(page_text) + 1
+
+
+def chunk_pages(
+    pages: list,
+    source: str,
+    chunk_tokens: int = CHUNK_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> list:
+    """
+    Chunk a document given as a list of page texts.
+    Returns [{"text": ..., "metadata": {"source", "page", "offset", "section", "chunk_index", "tokens"}}].
+    """
+    chunks = []
+    current = []  # (text, page, offset, tokens)
+    section = ""
+
+    def flush():
+        if not current:
+            return
+        text = "\n".join(unit[0] for unit in current)
+        chunks.append({
+            "text": text,
+            "metadata": {
+                "source": source,
+                "page": current[0][1],
+                "offset": current[0][2],
+                "section": section,
+                "chunk_index": len(chunks),
+                "tokens": count_tokens(text),
+            },
+        })
+
+    for text, page, offset, heading in _units(pages, chunk_tokens):
+        tokens = count_tokens(text)
+        if heading:
+            flush()
+            current = [(text, page, offset, tokens)]
+            section = text
+            continue
+
+        heading_only = len(current) == 1 and current[0][0] == section
+        if current and not heading_only and sum(unit[3] for unit in current) + tokens > chunk_tokens:
+            flush()
+            # Carry trailing units forward as overlap, without exceeding the budget
+            carried, carried_tokens = [], 0
+            for unit in reversed(current):
+                if carried_tokens + unit[3] > overlap_tokens or carried_tokens + unit[3] + tokens > chunk_tokens:
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit[3]
+            current = carried
+        current.append((text, page, offset, tokens))
+    flush()
+    return chunks
+
+
+def chunk_text(text: str, source: str, **kwargs) -> list:
+    """Chunk a single block of text (e.g. a .txt/.md file) as one page."""
+    return chunk_pages([text], source, **kwargs)
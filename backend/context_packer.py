@@ -0,0 +1,158 @@
+# backend/context_packer.py
+
+"""
+Token-budgeted packing of the RFP and reference proposals for the expand_rfp prompt.
+
+The RFP and the references each get a fixed token budget (CONTEXT_RFP_TOKENS,
+CONTEXT_REFERENCE_TOKENS); whatever one side leaves unused is lent to the other.
+An RFP over budget is split into heading-aware chunks. The chunks that state the
+most requirements are kept whole first, within a guaranteed share of the budget
+(CONTEXT_RFP_FULL_SHARE). What is left goes to one-line stubs of the other chunks,
+and the least requirement-dense stubs are dropped once they no longer fit. References are given equal shares in rank
+order and trimmed at line boundaries. Repeated boilerplate paragraphs are removed
+first. The same inputs always pack to the same prompt.
+"""
+
+import os
+import re
+
+from backend.chunker import chunk_text
+from backend.tokens import count_tokens, truncate_tokens
+
+CONTEXT_RFP_TOKENS = int(os.getenv("CONTEXT_RFP_TOKENS", 6000))
+CONTEXT_REFERENCE_TOKENS = int(os.getenv("CONTEXT_REFERENCE_TOKENS", 4000))
+CONTEXT_INSTRUCTION_TOKENS = int(os.getenv("CONTEXT_INSTRUCTION_TOKENS", 1000))
+# Share of the RFP budget reserved for chunks kept whole, before any stubs
+CONTEXT_RFP_FULL_SHARE = float(os.getenv("CONTEXT_RFP_FULL_SHARE", 0.75))
+RFP_PACK_CHUNK_TOKENS = 250
+STUB_TOKENS = 24
+OMITTED_MARKER = " [...]"
+
+_REQUIREMENT_TERMS = re.compile(
+    r"\b(shall|must|required?|requirements?|mandatory|deliverables?|deadlines?|due|submit|submission|scope|"
+    r"pricing|price|cost|budget|evaluation|criteria|compliance|sla|timeline|milestones?|security|warranty)\b",
+    re.IGNORECASE,
+)
+_FIGURES = re.compile(r"\$\s?\d|\b\d{1,2}/\d{1,2}/\d{2,4}\b|\b\d+(\.\d+)?\s?(%|days?|weeks?|months?|hours?)\b",
+                      re.IGNORECASE)
+
+
+def requirement_score(text: str, tokens: int) -> float:
+    """Requirement terms and figures (amounts, dates, durations) per 100 tokens."""
+    hits = len(_REQUIREMENT_TERMS.findall(text)) + 2 * len(_FIGURES.findall(text))
+    return 100 * hits / max(tokens, 1)
+
+
+def _normalize(text: str) -> str:
+    """Collapse runs of spaces and blank lines; token-free compression applied to everything."""
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\n\s*\n+", "\n\n", text).strip()
+
+
+def pack_rfp(rfp_text: str, budget: int) -> tuple:
+    """Fit the RFP into `budget` tokens. Returns (text, {"kept", "compressed", "dropped"} chunk counts)."""
+    chunks = [c["text"] for c in chunk_text(rfp_text, "rfp", chunk_tokens=RFP_PACK_CHUNK_TOKENS, overlap_tokens=0)]
+    tokens = [count_tokens(c) for c in chunks]
+    stubs = [truncate_tokens(c.split("\n", 1)[0], STUB_TOKENS) + OMITTED_MARKER for c in chunks]
+    stub_tokens = [count_tokens(s) for s in stubs]
+
+    ranked = sorted(range(len(chunks)), key=lambda i: (-requirement_score(chunks[i], tokens[i]), i))
+
+    # The most requirement-dense chunks are kept whole first, within their guaranteed share
+    keep, used = set(), 0
+    for i in ranked:
+        if used + tokens[i] <= budget * CONTEXT_RFP_FULL_SHARE:
+            keep.add(i)
+            used += tokens[i]
+
+    # The rest of the budget goes to stubs of the other chunks, the least requirement-dense dropped first
+    stubbed = set()
+    for i in ranked:
+        if i not in keep and used + stub_tokens[i] <= budget:
+            stubbed.add(i)
+            used += stub_tokens[i]
+
+    # Room left over (e.g. few chunks) upgrades stubs to full text, best first
+    for i in ranked:
+        if i in stubbed and used - stub_tokens[i] + tokens[i] <= budget:
+            stubbed.discard(i)
+            keep.add(i)
+            used += tokens[i] - stub_tokens[i]
+
+    dropped = set(range(len(chunks))) - keep - stubbed
+    parts = [chunks[i] if i in keep else stubs[i] for i in range(len(chunks)) if i not in dropped]
+    stats = {"kept": len(keep), "compressed": len(chunks) - len(keep) - len(dropped), "dropped": len(dropped)}
+    # Joining can merge a few tokens differently from the per-chunk counts; never exceed the budget
+    return truncate_tokens("\n".join(parts), budget), stats
+
+
+def pack_references(references: list, budget: int) -> list:
+    """
+    Trim references (best first) to share `budget` tokens. Shares are water-filled: short
+    references are kept whole and the rest of the budget is split evenly among the long ones.
+    """
+    seen, deduped = set(), []
+    for doc in references:
+        paragraphs = []
+        for paragraph in _normalize(doc).split("\n\n"):
+            key = " ".join(paragraph.split()).lower()
+            if key and key not in seen:
+                seen.add(key)
+                paragraphs.append(paragraph)
+        deduped.append("\n\n".join(paragraphs))
+
+    # Shortest first, so whatever a short reference leaves over reaches every longer one;
+    # among equal lengths the best-ranked goes last and gets any rounding remainder
+    sizes = [count_tokens(doc) for doc in deduped]
+    order = sorted(range(len(deduped)), key=lambda i: (sizes[i], -i))
+    shares, remaining = [0] * len(deduped), budget
+    for position, i in enumerate(order):
+        shares[i] = min(sizes[i], remaining // (len(order) - position))
+        remaining -= shares[i]
+
+    packed = []
+    for doc, size, share in zip(deduped, sizes, shares):
+        text = doc
+        if size > share:
+            text = truncate_tokens(doc, share - count_tokens(OMITTED_MARKER))
+            text = text + OMITTED_MARKER if text else ""
+        packed.append(text)
+    return packed
+
+
+def pack_context(rfp_text: str, retrieved_docs: list, rfp_budget: int = CONTEXT_RFP_TOKENS,
+                 reference_budget: int = CONTEXT_REFERENCE_TOKENS) -> dict:
+    """
+    Pack the RFP and references into their budgets.
+    Returns {"rfp_text", "references", "tokens": {...breakdown...}}.
+    """
+    rfp_text = _normalize(rfp_text)
+    references = [doc for doc in retrieved_docs or [] if doc and doc.strip()]
+    rfp_tokens = count_tokens(rfp_text)
+    reference_tokens = sum(count_tokens(doc) for doc in references)
+
+    # Unused budget on one side is lent to the other
+    rfp_budget, reference_budget = (
+        rfp_budget + max(0, reference_budget - reference_tokens),
+        reference_budget + max(0, rfp_budget - rfp_tokens),
+    )
+
+    rfp_stats = None  # the whole RFP fits
+    if rfp_tokens > rfp_budget:
+        rfp_text, rfp_stats = pack_rfp(rfp_text, rfp_budget)
+    if reference_tokens > reference_budget:
+        references = pack_references(references, reference_budget)
+
+    return {
+        "rfp_text": rfp_text,
+        "references": references,
+        "tokens": {
+            "rfp": count_tokens(rfp_text),
+            "rfp_original": rfp_tokens,
+            "rfp_budget": rfp_budget,
+            "rfp_chunks": rfp_stats,
+            "references": sum(count_tokens(doc) for doc in references),
+            "references_original": reference_tokens,
+            "references_budget": reference_budget,
+        },
+    }
@@ -0,0 +1,191 @@
+# backend/embedding_cache.py
+
+"""
+Persistent embedding cache keyed by (model, normalized-text hash).
+
+`CachedEmbeddings` wraps any LangChain `Embeddings` and stores float32 vectors in
+SQLite, so unchanged ingestion text, repeated queries and test strings are only
+ever embedded once per model. Least recently used rows are evicted past
+EMBEDDING_CACHE_MAX_ENTRIES.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+
+EVICT_CHECK_INTERVAL = 1000  # inserts between size checks
+LOOKUP_BATCH = 500  # stay under SQLite's bound-parameter limit
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial differences share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Drop-in `Embeddings` wrapper that serves repeat texts from an on-disk cache."""
+
+    def __init__(self, underlying: Embeddings, model: str, path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.underlying = underlying
+        self.model = model
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, keys: list) -> dict:
+        conn = self._connect()
+        found = {}
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for key, blob in conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ):
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+            if found:
+                with conn:
+                    conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})", (time.time(), *batch)
+                    )
+        return found
+
+    def _store(self, items: list):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, self.model, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+        with self._lock:
+            self._inserts += len(items)
+            check = self._inserts >= EVICT_CHECK_INTERVAL
+            if check:
+                self._inserts = 0
+        if check:
+            self._evict()
+
+    def _evict(self):
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        with conn:
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        with self._lock:
+            self.evictions += excess
+        logging.info(f"🧹 Evicted {excess} cached embeddings")
+
+    def _plan(self, texts: list) -> tuple:
+        """(keys, cached vectors by key, {key: text} still to embed)."""
+        keys = [cache_key(self.model, text) for text in texts]
+        found = self._lookup(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def _count(self, total: int, missed: int):
+        with self._lock:
+            self.misses += missed
+            self.hits += total - missed
+
+    def embed_documents(self, texts: list) -> list:
+        keys, found, missing = self._plan(texts)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new = list(zip(missing.keys(), vectors))
+            self._store(new)
+            found.update(new)
+        self._count(len(texts), len(missing))
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: list) -> list:
+        """Async embed_documents: SQLite work runs in a thread, misses use the underlying async client."""
+        keys, found, missing = await asyncio.to_thread(self._plan, texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            new = list(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._store, new)
+            found.update(new)
+        self._count(len(texts), len(missing))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list:
+        key = cache_key(self.model, text)
+        found = self._lookup([key])
+        if key in found:
+            with self._lock:
+                self.hits += 1
+            return found[key]
+
+        vector = self.underlying.embed_query(text)
+        self._store([(key, vector)])
+        with self._lock:
+            self.misses += 1
+        return vector
+
+    async def aembed_query(self, text: str) -> list:
+        key = cache_key(self.model, text)
+        found = await asyncio.to_thread(self._lookup, [key])
+        if key in found:
+            self._count(1, 0)
+            return found[key]
+
+        vector = await self.underlying.aembed_query(text)
+        await asyncio.to_thread(self._store, [(key, vector)])
+        self._count(1, 1)
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "max_entries": self.max_entries,
+            }
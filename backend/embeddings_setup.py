@@ -1,6 +1,13 @@
 # backend/embeddings_setup.py
 
-from langchain_openai import OpenAIEmbeddings
-
 # ✅ Ensure this matches Pinecone's 1536 dimensions
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def __getattr__(name):
+    # ✅ `embeddings` is created on first access and shared (see backend/providers.py)
+    if name == "embeddings":
+        from backend.providers import get_embeddings
+
+        return get_embeddings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
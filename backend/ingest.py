@@ -0,0 +1,267 @@
+# backend/ingest.py
+
+"""
+Shared document loading, chunking and incremental syncing for the proposal ingestion scripts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+from backend.chunker import chunk_pages
+from backend.ingest_pipeline import stream_ingest
+from backend.pdf_backends import extract_pdf_pages
+from backend.retrieval_cache import bump_index_version
+
+SUPPORTED_EXTENSIONS = ('.txt', '.md', '.pdf')
+
+
+def load_pages(file_path: str) -> list:
+    """Return a document's text as a list of pages (a text file is one page)."""
+    if file_path.lower().endswith(('.txt', '.md')):
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
+            return [file.read()]
+    if file_path.lower().endswith('.pdf'):
+        return extract_pdf_pages(file_path)["pages"]
+    raise ValueError(f"Unsupported file type for '{os.path.basename(file_path)}'.")
+
+
+def discover_files(docs_path: str) -> list:
+    """Supported files directly under `docs_path`, sorted by name."""
+    if not os.path.exists(docs_path):
+        raise ValueError(f"Directory {docs_path} does not exist. Please add your documents.")
+
+    files = []
+    for file_name in sorted(os.listdir(docs_path)):
+        file_path = os.path.join(docs_path, file_name)
+        if not os.path.isfile(file_path):
+            logging.info(f"Skipping '{file_name}': Not a file.")
+        elif not file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+            logging.info(f"Unsupported file type for '{file_name}'. Skipping.")
+        else:
+            files.append(file_path)
+    return files
+
+
+def chunk_file(file_path: str, source: str = None) -> list:
+    """Load and chunk one file; chunks carry source, page and offset metadata."""
+    pages = load_pages(file_path)
+    return chunk_pages(pages, source or os.path.basename(file_path))
+
+
+# --- Incremental ingestion -------------------------------------------------
+
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST", "ingest_manifest.json")
+CHECKPOINT_SECONDS = float(os.getenv("INGEST_CHECKPOINT_SECONDS", 10))
+DELETE_BATCH_SIZE = 1000
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(sha256: str, count: int) -> list:
+    """Deterministic vector ids: identical content always maps to identical ids."""
+    return [f"{sha256[:32]}-{i}" for i in range(count)]
+
+
+def load_manifest(manifest_path: str = MANIFEST_PATH):
+    """Return the manifest ({"files": {relpath: {"sha256", "chunk_ids"}}}), or None if there is none yet."""
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, manifest_path: str = MANIFEST_PATH):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def plan_ingestion(docs_path: str, manifest: dict) -> dict:
+    """
+    Compare the files under `docs_path` with the manifest.
+    Returns {"unchanged", "changed", "renamed", "removed"}: lists of (relpath, sha256),
+    renamed as (old_relpath, new_relpath, sha256), removed as relpaths.
+    """
+    known = manifest["files"]
+    current = {os.path.relpath(p, docs_path): file_sha256(p) for p in discover_files(docs_path)}
+
+    unchanged = [(name, h) for name, h in current.items() if known.get(name, {}).get("sha256") == h]
+    candidates = [(name, h) for name, h in current.items() if known.get(name, {}).get("sha256") != h]
+    gone = {name: entry for name, entry in known.items() if name not in current}
+
+    # A removed file whose bytes reappear under a new name keeps its vectors
+    gone_by_hash = {entry["sha256"]: name for name, entry in gone.items()}
+    renamed, changed = [], []
+    for name, h in candidates:
+        old_name = gone_by_hash.pop(h, None)
+        if old_name is not None and name not in known:
+            renamed.append((old_name, name, h))
+        else:
+            changed.append((name, h))
+    renamed_from = {old_name for old_name, _, _ in renamed}
+    removed = [name for name in gone if name not in renamed_from]
+    return {"unchanged": unchanged, "changed": changed, "renamed": renamed, "removed": removed}
+
+
+def delete_vectors(index, ids: list, files: dict = None, sparse_index=None):
+    """Delete `ids` in batches (from the BM25 index too), skipping any still referenced by a manifest entry in `files`."""
+    if files:
+        referenced = {i for entry in files.values() for i in entry["chunk_ids"]}
+        ids = [i for i in ids if i not in referenced]
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        index.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
+        if sparse_index is not None:
+            sparse_index.delete(ids=ids[i:i + DELETE_BATCH_SIZE])
+
+
+def backfill_sparse_index(docs_path: str, files: dict, sparse_index):
+    """Add already-embedded files missing from the BM25 index (re-chunking only, no embedding calls). Returns the count."""
+    added = 0
+    for name, entry in files.items():
+        if not entry["chunk_ids"] or entry["chunk_ids"][0] in sparse_index:
+            continue
+        chunks = chunk_file(os.path.join(docs_path, name), source=name)
+        if len(chunks) != len(entry["chunk_ids"]):
+            print(f"⚠️ '{name}' now chunks differently; it gets keyword search after its next re-ingestion.")
+            continue
+        sparse_index.add(entry["chunk_ids"], [c["text"] for c in chunks])
+        added += 1
+        print(f"Added {len(chunks)} chunks of '{name}' to the BM25 index.")
+    return added
+
+
+def verify_embedding_dimensions(embeddings, expected_dimension: int):
+    test_vector = embeddings.embed_query("Test embedding")
+    print(f"🔍 Debug: Generated embedding vector shape: {len(test_vector)}")
+    if len(test_vector) != expected_dimension:
+        raise ValueError(
+            f"❌ Embedding model mismatch! Expected {expected_dimension} but got {len(test_vector)}. "
+            "Check `embeddings_setup.py`."
+        )
+
+
+def sync_directory(
+    docs_path: str,
+    index,
+    embeddings,
+    manifest_path: str = MANIFEST_PATH,
+    expected_dimension: int = None,
+    sparse_index=None,
+) -> dict:
+    """
+    Bring the vector index in line with `docs_path` using the content-hash manifest:
+    only new or changed files are embedded and upserted, and only vectors of changed
+    or removed files are deleted. An unchanged corpus makes zero embedding calls.
+    Without a manifest the index contents are unknown, so it is cleared once first.
+    `expected_dimension` checks the embedding model, only when something needs embedding.
+    `sparse_index` (a BM25Index) is kept in step with the vectors and saved with the manifest.
+    """
+    index_changed = False
+    manifest = load_manifest(manifest_path)
+    if manifest is None:
+        print("No ingestion manifest found; clearing the index before the first incremental run.")
+        index.delete(delete_all=True)
+        if sparse_index is not None:
+            sparse_index.delete(delete_all=True)
+        manifest = {"files": {}}
+        index_changed = True
+
+    plan = plan_ingestion(docs_path, manifest)
+    files = manifest["files"]
+    if plan["changed"] and expected_dimension:
+        verify_embedding_dimensions(embeddings, expected_dimension)
+
+    index_changed = index_changed or any(plan[key] for key in ("changed", "renamed", "removed"))
+    for old_name, new_name, _ in plan["renamed"]:
+        files[new_name] = files.pop(old_name)
+        print(f"Renamed '{old_name}' -> '{new_name}' (vectors reused).")
+
+    # Files whose bytes are already indexed (or queued) under another name reuse those vectors
+    jobs, aliases = [], {}
+    for name, sha256 in plan["changed"]:
+        owner = next((entry for entry in files.values() if entry["sha256"] == sha256), None)
+        if owner is not None:
+            previous = files.pop(name, {"chunk_ids": []})
+            files[name] = {"sha256": sha256, "chunk_ids": list(owner["chunk_ids"])}
+            delete_vectors(index, previous["chunk_ids"], files, sparse_index)
+            print(f"'{name}' duplicates an indexed file (vectors reused).")
+        elif sha256 in aliases:
+            aliases[sha256].append(name)
+        else:
+            aliases[sha256] = []
+            jobs.append({"name": name, "sha256": sha256})
+
+    if sparse_index is not None:
+        indexed = [name for name, _ in plan["unchanged"]] + [new_name for _, new_name, _ in plan["renamed"]]
+        if backfill_sparse_index(docs_path, {name: files[name] for name in indexed}, sparse_index):
+            index_changed = True
+
+    last_checkpoint = time.monotonic()
+
+    def checkpoint(force: bool = False):
+        nonlocal last_checkpoint
+        if force or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+            # BM25 first: the manifest never lists files the keyword index is missing
+            if sparse_index is not None:
+                sparse_index.save()
+            save_manifest(manifest, manifest_path)
+            if index_changed:
+                # ✅ Cached retrieval results (in any process) are stale once the index changes
+                bump_index_version()
+            last_checkpoint = time.monotonic()
+
+    def iter_jobs():
+        # Lazily chunk each file inside the pipeline's extract stage
+        for job in jobs:
+            def load(job=job):
+                chunks = chunk_file(os.path.join(docs_path, job["name"]), source=job["name"])
+                job["chunk_ids"] = chunk_ids(job["sha256"], len(chunks))
+                job["texts"] = [c["text"] for c in chunks]
+                return [{"id": i, "text": c["text"], "metadata": c["metadata"]} for i, c in zip(job["chunk_ids"], chunks)]
+            job["load"] = load
+            yield job
+
+    def on_file_done(job):
+        # New vectors are in before the old ones come out, so a file never disappears from the index
+        if sparse_index is not None:
+            sparse_index.add(job["chunk_ids"], job["texts"])
+        job.pop("texts", None)
+        for name in [job["name"], *aliases[job["sha256"]]]:
+            previous = files.pop(name, {"chunk_ids": []})
+            files[name] = {"sha256": job["sha256"], "chunk_ids": job["chunk_ids"]}
+            delete_vectors(index, previous["chunk_ids"], files, sparse_index)
+        print(f"Upserted {len(job['chunk_ids'])} chunks for '{job['name']}'.")
+        checkpoint()
+
+    def on_file_error(job, exc):
+        # The previous version (if any) stays indexed and is retried next run
+        job.pop("texts", None)
+        print(f"Error processing '{job['name']}': {exc}")
+
+    try:
+        if jobs:
+            stats = stream_ingest(iter_jobs(), embeddings.embed_documents, index, on_file_done, on_file_error)
+            print(f"Embedded and upserted {stats['chunks']} chunks from {stats['docs']} files ({stats['docs_per_sec']} docs/sec).")
+    finally:
+        # ✅ Completed files are checkpointed even if the run is interrupted, so a rerun resumes from here
+        checkpoint(force=True)
+
+    for name in plan["removed"]:
+        entry = files.pop(name)
+        delete_vectors(index, entry["chunk_ids"], files, sparse_index)
+        print(f"Deleted vectors for removed file '{name}'.")
+
+    checkpoint(force=True)
+    summary = {key: len(value) for key, value in plan.items()}
+    print(f"Ingestion complete: {summary}")
+    return summary
@@ -0,0 +1,303 @@
+# backend/ingest_pipeline.py
+
+"""
+Streaming, batched and concurrent embedding and upsert for proposal ingestion.
+
+Chunks are grouped into embedding requests by token budget, a bounded (and
+adaptive) number of requests run at once with backoff on 429s, and vectors are
+upserted to the index in fixed-size batches on a thread pool.
+
+`embed_fn` is any callable taking a list of texts and returning a list of vectors
+(e.g. `embeddings.embed_documents`) and `index` is anything with Pinecone's
+`upsert(vectors=[{"id", "values", "metadata"}])`, so a local stand-in service and a
+fake index can be dropped in (see benchmarks/bench_ingest_pipeline.py).
+"""
+
+import collections
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.tokens import count_tokens
+
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", 60000))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 512))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 100))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", 4))
+
+MAX_RETRIES = 8
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+def batch_by_tokens(items, text=lambda item: item, max_tokens: int = EMBED_BATCH_TOKENS,
+                    max_items: int = EMBED_BATCH_SIZE):
+    """Lazily group `items` into lists under both a token budget (of `text(item)`) and an item cap."""
+    current, current_tokens = [], 0
+    for item in items:
+        tokens = count_tokens(text(item))
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            yield current
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def _status_code(exc: Exception):
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    return _status_code(exc) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def is_input_error(exc: Exception) -> bool:
+    """The service rejected the request's input (e.g. a text over the model's limit); resending it won't help."""
+    return _status_code(exc) in (400, 413, 422) or type(exc).__name__ in ("BadRequestError", "UnprocessableEntityError")
+
+
+def _retry_after(exc: Exception):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that halves on a 429 and grows back by one after a run
+    of successful requests (AIMD), never exceeding `max_concurrency`.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, rate_limited: bool = False):
+        with self._cond:
+            self.active -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _embed_batch(texts: list, embed_fn, limiter: AdaptiveConcurrency, stats: dict, lock: threading.Lock) -> list:
+    """One embedding request under the limiter, retried with backoff on 429s."""
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            result = embed_fn(texts)
+        except Exception as e:
+            limiter.release(rate_limited=is_rate_limit_error(e))
+            if not is_rate_limit_error(e) or attempt == MAX_RETRIES:
+                raise
+            delay = _retry_after(e) or min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay += random.uniform(0, delay / 2)
+            with lock:
+                stats["rate_limit_retries"] += 1
+            logging.warning(f"⏳ Embedding rate limited; retrying in {delay:.1f}s (limit now {limiter.limit})")
+            time.sleep(delay)
+            continue
+        limiter.release()
+        with lock:
+            stats["embed_requests"] += 1
+        return result
+
+
+def _payload(record: dict, vector: list) -> dict:
+    return {"id": record["id"], "values": vector, "metadata": {**record["metadata"], "text": record["text"]}}
+
+
+# --- Streaming ingestion ---------------------------------------------------
+
+INGEST_QUEUE_FILES = int(os.getenv("INGEST_QUEUE_FILES", 4))
+
+_END = object()
+
+
+def stream_ingest(jobs, embed_fn, index, on_file_done, on_file_error=None, namespace: str = None,
+                  concurrency: int = EMBED_CONCURRENCY, queue_files: int = INGEST_QUEUE_FILES) -> dict:
+    """
+    Streaming discover → extract → chunk → embed → upsert.
+
+    `jobs` is an iterable (ideally a generator) of {"name", "load"} dicts, where
+    `load()` returns a file's chunk records ([{"id", "text", "metadata"}]). Stages run
+    on their own threads connected by bounded queues, so at most `queue_files` chunked
+    files and a few embedding batches are held at once, whatever the corpus size.
+
+    `on_file_done(job)` is called on the calling thread once every chunk of a file is
+    upserted; callers checkpoint there so an interrupted run resumes where it stopped.
+    `on_file_error(job, exc)` is called for files that fail to load; the run continues.
+    """
+    stats = {"embed_requests": 0, "rate_limit_retries": 0, "docs": 0, "chunks": 0, "failed": 0}
+    lock = threading.Lock()
+    limiter = AdaptiveConcurrency(concurrency)
+    chunk_queue = queue.Queue(maxsize=max(1, queue_files))
+    upsert_queue = queue.Queue(maxsize=limiter.max_concurrency * 2)
+    stop = threading.Event()
+    errors = []
+    kwargs = {"namespace": namespace} if namespace else {}
+
+    def put(q, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _END
+
+    def extract_stage():
+        try:
+            for job in jobs:
+                if stop.is_set():
+                    return
+                try:
+                    records = job["load"]()
+                except Exception as e:
+                    with lock:
+                        stats["failed"] += 1
+                    if on_file_error:
+                        on_file_error(job, e)
+                    continue
+                if not put(chunk_queue, (job, records)):
+                    return
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(chunk_queue, _END)
+
+    def chunked_records():
+        """(file name, record) pairs; a file is announced to the upsert stage before its chunks."""
+        while True:
+            item = get(chunk_queue)
+            if item is _END:
+                return
+            job, records = item
+            if not put(upsert_queue, ("file", job, len(records))):
+                return
+            for record in records:
+                yield job["name"], record
+
+    def embed_stage():
+        pool = ThreadPoolExecutor(max_workers=limiter.max_concurrency, thread_name_prefix="embed")
+        in_flight = collections.deque()
+
+        def drain_one():
+            records, future = in_flight.popleft()
+            put(upsert_queue, ("vectors", records, future.result()))
+
+        try:
+            for batch in batch_by_tokens(chunked_records(), text=lambda item: item[1]["text"]):
+                texts = [record["text"] for _, record in batch]
+                in_flight.append((batch, pool.submit(_embed_batch, texts, embed_fn, limiter, stats, lock)))
+                while len(in_flight) > limiter.max_concurrency:
+                    drain_one()
+            while in_flight and not stop.is_set():
+                drain_one()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            pool.shutdown(wait=False)
+            put(upsert_queue, _END)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=extract_stage, name="ingest-extract", daemon=True),
+        threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Upsert stage runs here so on_file_done (manifest checkpoints) stays on the caller's thread
+    upsert_pool = ThreadPoolExecutor(max_workers=max(1, UPSERT_WORKERS), thread_name_prefix="upsert")
+    remaining = {}  # file name -> [job, chunks not yet upserted]
+    in_flight = collections.deque()
+
+    def complete(job):
+        stats["docs"] += 1
+        on_file_done(job)
+
+    def finish_one():
+        records, future = in_flight.popleft()
+        future.result()
+        stats["chunks"] += len(records)
+        for name, _ in records:
+            remaining[name][1] -= 1
+            if remaining[name][1] == 0:
+                complete(remaining.pop(name)[0])
+
+    try:
+        while True:
+            item = get(upsert_queue)
+            if item is _END:
+                break
+            if item[0] == "file":
+                _, job, count = item
+                if count == 0:
+                    complete(job)
+                else:
+                    remaining[job["name"]] = [job, count]
+                continue
+
+            _, records, vectors = item
+            for i in range(0, len(records), UPSERT_BATCH_SIZE):
+                part = records[i:i + UPSERT_BATCH_SIZE]
+                payload = [_payload(record, vector) for (_, record), vector in zip(part, vectors[i:i + UPSERT_BATCH_SIZE])]
+                in_flight.append((part, upsert_pool.submit(index.upsert, vectors=payload, **kwargs)))
+            while len(in_flight) > UPSERT_WORKERS * 2:
+                finish_one()
+        while in_flight:
+            finish_one()
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        upsert_pool.shutdown(wait=True)
+        for thread in threads:
+            thread.join(timeout=5)
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - started
+    stats.update({
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(stats["docs"] / elapsed, 2) if elapsed else 0.0,
+        "chunks_per_sec": round(stats["chunks"] / elapsed, 2) if elapsed else 0.0,
+    })
+    logging.info(f"📈 Streaming ingestion: {stats}")
+    return stats
@@ -0,0 +1,290 @@
+# backend/job_queue.py
+
+"""
+Persistent background jobs for parse → retrieve → generate.
+
+Jobs live in a local SQLite database, so a burst of uploads is queued instead of
+holding HTTP connections open, and a restart picks up in-flight jobs from the
+last completed stage. Every running job records the process that claimed it and
+a heartbeat; only jobs whose heartbeat went stale are requeued, so API processes
+sharing the database never re-run each other's live jobs.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+JOBS_DB_PATH = os.getenv("RFP_JOBS_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("RFP_JOB_WORKERS", 2))
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 10.0
+# A running job whose owner hasn't heartbeat for this long is assumed dead and requeued
+JOB_STALE_SECONDS = float(os.getenv("RFP_JOB_STALE_SECONDS", 60))
+# Back-off after a database error (e.g. "database is locked") in the worker and heartbeat threads
+ERROR_BACKOFF_SECONDS = 1.0
+ERROR_BACKOFF_MAX_SECONDS = 30.0
+
+# Stage a job runs next; each one persists its output before advancing
+STAGES = ("parse", "retrieve", "generate", "done")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_local = threading.local()
+_claim_lock = threading.Lock()
+_wakeup = threading.Event()
+_workers = []
+_owner = None  # "<host>:<pid>:<nonce>" of this process, set by start_workers
+
+
+def _connect() -> sqlite3.Connection:
+    """One connection per thread; autocommit so claims can use BEGIN IMMEDIATE."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        _local.conn = conn
+    return conn
+
+
+def init_db():
+    conn = _connect()
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            filename TEXT,
+            file_path TEXT NOT NULL,
+            sha256 TEXT,
+            rfp_text TEXT,
+            retrieved_docs TEXT,
+            proposal TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            owner TEXT,
+            heartbeat_at REAL
+        )
+        """
+    )
+    # Databases created before owners and heartbeats were tracked
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+
+def _update(job_id: str, **fields):
+    fields["updated_at"] = time.time()
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    _connect().execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _backoff(failures: int) -> float:
+    return min(ERROR_BACKOFF_MAX_SECONDS, ERROR_BACKOFF_SECONDS * 2 ** (failures - 1))
+
+
+def _finish(job_id: str, **fields):
+    """
+    Record a job's final status, retrying through database errors: a running job left
+    behind would be heartbeated by this process, and so never requeued, until it exits.
+    """
+    failures = 0
+    while True:
+        try:
+            _update(job_id, **fields)
+            return
+        except sqlite3.Error as e:
+            failures += 1
+            logging.warning(f"⚠️ Could not record job {job_id} as {fields.get('status')}: {e}; retrying")
+            time.sleep(_backoff(failures))
+
+
+def submit_job(file_path: str, filename: str = None, sha256: str = None) -> str:
+    """Queue a parse-and-generate job for an uploaded RFP and return its id."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    _connect().execute(
+        "INSERT INTO jobs (id, status, stage, filename, file_path, sha256, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, QUEUED, STAGES[0], filename, file_path, sha256, now, now),
+    )
+    _wakeup.set()
+    return job_id
+
+
+def get_job(job_id: str):
+    """Return the job row as a dict, or None."""
+    row = _connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["retrieved_docs"] = json.loads(job["retrieved_docs"]) if job["retrieved_docs"] else []
+    return job
+
+
+def cancel_job(job_id: str):
+    """
+    Cancel a job. Queued jobs are cancelled immediately; running jobs stop
+    before their next stage. Returns the updated job, or None if unknown.
+    """
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is not None and row["status"] not in FINISHED:
+            if row["status"] == QUEUED:
+                _update(job_id, status=CANCELLED, cancel_requested=1)
+            else:
+                _update(job_id, cancel_requested=1)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return get_job(job_id)
+
+
+def _claim_next():
+    """Atomically move the oldest queued job to running."""
+    conn = _connect()
+    with _claim_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                _update(row["id"], status=RUNNING, owner=_owner, heartbeat_at=time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return get_job(row["id"]) if row is not None else None
+
+
+def _requeue_stale() -> int:
+    """Requeue running jobs whose owner stopped heartbeating (crashed or restarted)."""
+    now = time.time()
+    return _connect().execute(
+        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? "
+        "WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+        (QUEUED, now, RUNNING, now - JOB_STALE_SECONDS),
+    ).rowcount
+
+
+def _heartbeat_loop():
+    failures = 0
+    while True:
+        try:
+            _connect().execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?", (time.time(), _owner, RUNNING)
+            )
+            resumed = _requeue_stale()
+            if resumed:
+                logging.info(f"🔁 Requeued {resumed} job(s) from a process that stopped")
+                _wakeup.set()
+            failures = 0
+        except Exception as e:
+            # Retry well inside JOB_STALE_SECONDS so other processes don't take over our live jobs
+            failures += 1
+            logging.warning(f"⚠️ Job heartbeat failed: {e}")
+        time.sleep(min(HEARTBEAT_INTERVAL, _backoff(failures)) if failures else HEARTBEAT_INTERVAL)
+
+
+def _run_stage(job: dict):
+    """Run the job's current stage and persist its output."""
+    # Imported lazily so the queue module stays cheap to import
+    from backend.parse_cache import parse_rfp_pdf_cached, sha256_file
+    from backend.pinecone_utils import retrieve_similar_docs
+    from backend.retrieval import PROPOSAL_RETRIEVAL_MODE
+    from backend.llm_utils import expand_rfp, conversation_memory
+
+    stage = job["stage"]
+    if stage == "parse":
+        # The parse is cached under the submitted digest, so never parse bytes that don't match it
+        if job["sha256"] and sha256_file(job["file_path"]) != job["sha256"]:
+            raise RuntimeError(f"{job['file_path']} changed since the job was submitted.")
+        result = parse_rfp_pdf_cached(job["file_path"], digest=job["sha256"])
+        if result["text"].startswith("Error:"):
+            raise RuntimeError(result["text"])
+        _update(job["id"], rfp_text=result["text"], sha256=result["sha256"], stage="retrieve")
+    elif stage == "retrieve":
+        retrieved_docs = retrieve_similar_docs(job["rfp_text"], top_k=3, mode=PROPOSAL_RETRIEVAL_MODE)
+        _update(job["id"], retrieved_docs=json.dumps(retrieved_docs), stage="generate")
+    elif stage == "generate":
+        proposal = expand_rfp(job["rfp_text"], job["retrieved_docs"])
+        conversation_memory["latest_proposal"] = proposal
+        _update(job["id"], proposal=proposal, stage="done")
+
+
+def _process(job: dict):
+    job_id = job["id"]
+    logging.info(f"⚙️ Job {job_id} started at stage '{job['stage']}'")
+    try:
+        while job["stage"] != "done":
+            if job["cancel_requested"]:
+                _finish(job_id, status=CANCELLED)
+                logging.info(f"🛑 Job {job_id} cancelled before stage '{job['stage']}'")
+                return
+            started = time.perf_counter()
+            _run_stage(job)
+            logging.info(f"✅ Job {job_id} finished '{job['stage']}' in {time.perf_counter() - started:.2f}s")
+            job = get_job(job_id)
+    except Exception as e:
+        logging.error(f"❌ Job {job_id} failed at stage '{job['stage']}': {e}")
+        _finish(job_id, status=FAILED, error=str(e))
+        return
+    _finish(job_id, status=SUCCEEDED)
+
+
+def _worker_loop():
+    failures = 0
+    while True:
+        try:
+            job = _claim_next()
+            failures = 0
+        except Exception as e:
+            failures += 1
+            logging.warning(f"⚠️ Could not claim a job: {e}; retrying in {_backoff(failures):.0f}s")
+            time.sleep(_backoff(failures))
+            continue
+        if job is None:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        try:
+            _process(job)
+        except Exception as e:
+            # _process records stage failures itself; anything else must not kill the worker
+            logging.error(f"❌ Worker error on job {job['id']}: {e}")
+
+
+def start_workers(count: int = JOB_WORKERS):
+    """Create the table, requeue jobs whose process stopped and start the worker and heartbeat threads."""
+    global _owner
+    if _workers:
+        return
+    init_db()
+    _owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    # Jobs still heartbeating belong to another live process and are left alone
+    resumed = _requeue_stale()
+    if resumed:
+        logging.info(f"🔁 Resuming {resumed} in-flight job(s)")
+
+    heartbeat = threading.Thread(target=_heartbeat_loop, name="rfp-job-heartbeat", daemon=True)
+    heartbeat.start()
+    _workers.append(heartbeat)
+
+    for i in range(count):
+        worker = threading.Thread(target=_worker_loop, name=f"rfp-job-{i}", daemon=True)
+        worker.start()
+        _workers.append(worker)
@@ -1,26 +1,100 @@
 # backend/llm_utils.py
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
-load_dotenv()
-from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.chains import LLMChain
-from langchain.prompts import PromptTemplate
-
-
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-llm = ChatOpenAI(
-    openai_api_key=openai_api_key,
-    model_name="gpt-4o-mini",
-    temperature=0.0
-)
+import time
+from functools import lru_cache
+from backend.context_packer import CONTEXT_INSTRUCTION_TOKENS, pack_context
+from backend.providers import get_llm
+from backend.tokens import count_tokens
+
+# ✅ Async generation limits: at most LLM_MAX_CONCURRENCY calls in flight per process,
+# and each request (queueing included) gives up after LLM_TIMEOUT_SECONDS
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 64))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 120))
+
+_llm_semaphore = None
+
+
+def __getattr__(name):
+    # ✅ `llm` is the shared client from backend/providers.py, created on first use
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def log_prompt_tokens(prompt: str, tokens: dict):
+    """Log the prompt's token breakdown: instructions, RFP and references against their budgets."""
+    total = count_tokens(prompt)
+    instructions = total - tokens["rfp"] - tokens["references"]
+    chunks = tokens["rfp_chunks"]
+    rfp_note = (f", {chunks['kept']} chunks kept / {chunks['compressed']} compressed / {chunks['dropped']} dropped"
+                if chunks else "")
+    logging.info(
+        f"🧮 Prompt tokens: total {total} = instructions {instructions} + "
+        f"RFP {tokens['rfp']}/{tokens['rfp_budget']} (from {tokens['rfp_original']}{rfp_note}) + "
+        f"references {tokens['references']}/{tokens['references_budget']} (from {tokens['references_original']})"
+    )
+    if instructions > CONTEXT_INSTRUCTION_TOKENS:
+        logging.warning(f"⚠️ Prompt instructions use {instructions} tokens (budget {CONTEXT_INSTRUCTION_TOKENS})")
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    # Created on first use, inside the server's event loop
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _llm_semaphore
+
+
+async def ainvoke_llm(prompt: str, timeout: float = LLM_TIMEOUT_SECONDS) -> str:
+    """Async LLM call under the global concurrency limit; raises asyncio.TimeoutError after `timeout` seconds."""
+    async def call():
+        async with _get_llm_semaphore():
+            response = await get_llm().ainvoke(prompt)
+        return response.content.strip()
+
+    return await asyncio.wait_for(call(), timeout=timeout)
+
+
+async def astream_llm(prompt: str, timeout: float = LLM_TIMEOUT_SECONDS):
+    """
+    Yield the LLM's text chunks as they arrive, under the global concurrency limit.
+    Raises asyncio.TimeoutError once the whole call (queueing included) passes `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    semaphore = _get_llm_semaphore()
+    await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+    chunks = None
+    try:
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = get_llm().astream(prompt).__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+            except StopAsyncIteration:
+                break
+            if not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                logging.info(f"✅ First token after {first_token_at - started:.2f}s")
+            yield chunk.content
+        logging.info(f"✅ Stream finished in {time.perf_counter() - started:.2f}s")
+    finally:
+        # ✅ Close the upstream stream and free the slot even if the client went away mid-stream
+        if chunks is not None and hasattr(chunks, "aclose"):
+            await chunks.aclose()
+        semaphore.release()
+
+
+def build_expand_prompt(rfp_text, retrieved_docs) -> str:
+    """The expand_rfp prompt, with the RFP and references packed into their token budgets."""
+    # ✅ Fit the RFP and references into their token budgets before building the prompt
+    packed = pack_context(rfp_text, retrieved_docs)
+    rfp_text, retrieved_docs = packed["rfp_text"], packed["references"]
 
-def expand_rfp(rfp_text, retrieved_docs):
-    """Generates a thorough business proposal in response to an RFP, ensuring past proposal data is effectively reused."""
-    
     structured_context = "\n\n".join([
         f"🔹 **Reference Proposal {i+1}**:\n{doc}" for i, doc in enumerate(retrieved_docs)
     ]) if retrieved_docs else "No similar documents found."
@@ -79,21 +153,36 @@ def expand_rfp(rfp_text, retrieved_docs):
     - Ensure pricing, solutions, and technical details align with industry best practices.  
     """
 
+    log_prompt_tokens(prompt, packed["tokens"])
     print(f"\n📝 Sending this prompt to GPT:\n{prompt[:1500]}")  # ✅ Debugging output
+    return prompt
+
 
-    response = llm.invoke(prompt)
+def expand_rfp(rfp_text, retrieved_docs):
+    """Generates a thorough business proposal in response to an RFP, ensuring past proposal data is effectively reused."""
+    response = get_llm().invoke(build_expand_prompt(rfp_text, retrieved_docs))
     return response.content.strip()
 
 
+async def aexpand_rfp(rfp_text, retrieved_docs):
+    """Async expand_rfp: packing runs off the event loop, the LLM call is awaited under the global limit."""
+    prompt = await asyncio.to_thread(build_expand_prompt, rfp_text, retrieved_docs)
+    return await ainvoke_llm(prompt)
+
+
+async def astream_expand_rfp(rfp_text, retrieved_docs):
+    """Streaming expand_rfp: yields the proposal's text chunks as the LLM produces them."""
+    prompt = await asyncio.to_thread(build_expand_prompt, rfp_text, retrieved_docs)
+    async for text in astream_llm(prompt):
+        yield text
+
+
 # Maintain memory for ongoing refinements
 conversation_memory = {"latest_proposal": ""}
 
 # --- Create a conversational chain for proposal refinement ---
 
-# Define a prompt template that will include the conversation history and new feedback.
-refine_prompt_template = PromptTemplate(
-    input_variables=["chat_history", "input"],
-    template="""
+REFINE_PROMPT_TEMPLATE = """
 You are an expert proposal writer tasked with refining a business proposal based on user feedback.
 
 Conversation History:
@@ -104,21 +193,34 @@ User Feedback:
 
 Please produce an updated proposal that incorporates this feedback while preserving all previous refinements.
 """
-)
 
-# Create a memory object to hold the conversation history.
-refine_memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
 
-# Create the conversational chain using the prompt template and memory.
-refine_chain = ConversationChain(
-    llm=llm,
-    prompt=refine_prompt_template,
-    memory=refine_memory
-)
+@lru_cache(maxsize=None)
+def get_refine_chain():
+    """Conversational refinement chain with buffer memory, built on first use."""
+    from langchain.memory import ConversationBufferMemory
+    from langchain.chains import ConversationChain
+    from langchain.prompts import PromptTemplate
+
+    # Define a prompt template that will include the conversation history and new feedback.
+    refine_prompt_template = PromptTemplate(
+        input_variables=["chat_history", "input"],
+        template=REFINE_PROMPT_TEMPLATE
+    )
+
+    # Create a memory object to hold the conversation history.
+    refine_memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+
+    # Create the conversational chain using the prompt template and memory.
+    return ConversationChain(
+        llm=get_llm(),
+        prompt=refine_prompt_template,
+        memory=refine_memory
+    )
  
-def refine_proposal(current_proposal: str, user_feedback: str) -> dict:
+def build_refine_prompt(current_proposal: str, user_feedback: str) -> str:
     # Construct a prompt that combines the current proposal and the user feedback.
-    prompt = f"""
+    return f"""
 You are an expert proposal writer. Given the current proposal below and the user feedback provided, generate a refined proposal that incorporates the feedback and improves upon the original.
 
 Current Proposal:
@@ -129,8 +231,11 @@ User Feedback:
 
 Refined Proposal:
 """
+
+
+def refine_proposal(current_proposal: str, user_feedback: str) -> dict:
     # Call the LLM directly with the new prompt.
-    response = llm.invoke(prompt)
+    response = get_llm().invoke(build_refine_prompt(current_proposal, user_feedback))
     refined_proposal = response.content.strip()
     
     # Update the global conversation memory with the new refined proposal.
@@ -139,7 +244,14 @@ Refined Proposal:
     return {"refined_proposal": refined_proposal}
 
 
+async def arefine_proposal(current_proposal: str, user_feedback: str) -> dict:
+    """Async refine_proposal under the global LLM concurrency limit and timeout."""
+    refined_proposal = await ainvoke_llm(build_refine_prompt(current_proposal, user_feedback))
+    conversation_memory["latest_proposal"] = refined_proposal
+    return {"refined_proposal": refined_proposal}
 
 
-
-
+async def astream_refine_proposal(current_proposal: str, user_feedback: str):
+    """Streaming refine_proposal: yields the refined proposal's text chunks as the LLM produces them."""
+    async for text in astream_llm(build_refine_prompt(current_proposal, user_feedback)):
+        yield text
@@ -0,0 +1,63 @@
+# backend/ocr_reconcile.py
+
+"""
+Drop OCR text that repeats what the PDF text layer already contains.
+
+OCR lines are compared with the page's text layer using word shingles, so
+OCR noise (spacing, casing, punctuation, the odd misread word) still matches.
+Only lines that are genuinely new are kept.
+"""
+
+import re
+
+from backend.tokens import count_tokens
+
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.6  # share of a line's shingles already in the text layer
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def _shingles(words: list, size: int = SHINGLE_SIZE) -> set:
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def reconcile_ocr_text(text_layer: str, ocr_text: str) -> tuple:
+    """
+    Return (novel_ocr_text, stats) where novel_ocr_text keeps only OCR lines not already
+    covered by `text_layer`, and stats has the lines/tokens kept and removed.
+    """
+    if not ocr_text.strip():
+        return "", {"ocr_lines": 0, "lines_removed": 0, "tokens_saved": 0}
+    if not text_layer.strip():
+        return ocr_text, {"ocr_lines": len(ocr_text.splitlines()), "lines_removed": 0, "tokens_saved": 0}
+
+    layer_words = _words(text_layer)
+    layer_shingles = _shingles(layer_words)
+    layer_vocab = set(layer_words)
+
+    kept, removed = [], []
+    for line in ocr_text.splitlines():
+        words = _words(line)
+        if not words:
+            continue
+        if len(words) < SHINGLE_SIZE:
+            # Too short to shingle: duplicate if every word is already on the page
+            duplicate = all(word in layer_vocab for word in words)
+        else:
+            shingles = _shingles(words)
+            duplicate = len(shingles & layer_shingles) / len(shingles) >= DUPLICATE_THRESHOLD
+        (removed if duplicate else kept).append(line)
+
+    novel_text = "\n".join(kept)
+    return novel_text, {
+        "ocr_lines": len(kept) + len(removed),
+        "lines_removed": len(removed),
+        "tokens_saved": count_tokens("\n".join(removed)),
+    }
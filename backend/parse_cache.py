@@ -0,0 +1,248 @@
+# backend/parse_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from backend.parse_rfp_pdf import PARSER_VERSION, parse_rfp_pdf_with_report
+from backend.pdf_backends import PDF_BACKEND, page_text
+
+# ✅ Cache settings
+PARSE_CACHE_DIR = os.getenv("RFP_PARSE_CACHE_DIR", "parse_cache")
+PARSE_CACHE_MAX_BYTES = int(os.getenv("RFP_PARSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Content-addressed, size-bounded LRU cache of parsed RFPs on disk.
+    Entries are keyed by the SHA-256 of the PDF bytes plus PARSER_VERSION and the
+    configured PDF_BACKEND, so a re-upload under a new filename is a hit while a parser
+    change or a backend switch (which changes the extracted text) is a miss.
+    """
+
+    def __init__(self, cache_dir: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = None  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+
+    @staticmethod
+    def key(digest: str) -> str:
+        return f"{digest}-v{PARSER_VERSION}-{PDF_BACKEND}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def _load_index(self):
+        """Rebuild the LRU order from file mtimes the first time the cache is touched."""
+        if self._entries is not None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[: -len(".json")], stat.st_size))
+
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(files))
+        self._total_bytes = sum(self._entries.values())
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            logging.info(f"🧹 Evicted parse cache entry {key}")
+
+    def get(self, digest: str):
+        """Return the cached {"text", "pages"} for `digest`, or None on a miss."""
+        key = self.key(digest)
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # keep LRU order across restarts
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Dropping unreadable parse cache entry {key}: {e}")
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def _tmp_path(self, digest: str, suffix: str = "") -> str:
+        return f"{self._path(self.key(digest))}.{os.getpid()}.{threading.get_ident()}{suffix}.tmp"
+
+    def put(self, digest: str, text: str, pages: list):
+        """Store a parse result, evicting least recently used entries past `max_bytes`."""
+        entry = {
+            "sha256": digest, "parser_version": PARSER_VERSION, "pdf_backend": PDF_BACKEND,
+            "text": text, "pages": pages,
+        }
+        with self._lock:
+            self._load_index()
+        tmp_path = self._tmp_path(digest)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        self._install(digest, tmp_path)
+
+    def writer(self, digest: str) -> "CacheWriter":
+        """A writer that builds `digest`'s entry page by page on disk (see `CacheWriter`)."""
+        with self._lock:
+            self._load_index()
+        return CacheWriter(self, digest)
+
+    def _install(self, digest: str, tmp_path: str):
+        """Move a finished entry file into place and account for it in the LRU."""
+        key = self.key(digest)
+        path = self._path(key)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "parser_version": PARSER_VERSION,
+                "pdf_backend": PDF_BACKEND,
+            }
+
+
+def _json_chars(text: str) -> str:
+    """`text` escaped as the inside of a JSON string; pieces concatenate to the escape of the whole."""
+    return json.dumps(text)[1:-1]
+
+
+class CacheWriter:
+    """
+    Builds a cache entry from page records as they are extracted, spooling the records and
+    the `page_text` layout to temp files, so a streamed parse holds one page in memory
+    however long the document is. `commit()` writes the same entry `ParseCache.put` would.
+    """
+
+    def __init__(self, cache: ParseCache, digest: str):
+        self.cache = cache
+        self.digest = digest
+        self.pages = 0
+        self._pages_path = cache._tmp_path(digest, ".pages")
+        self._text_path = cache._tmp_path(digest, ".text")
+        self._pages_file = open(self._pages_path, "w", encoding="utf-8")
+        self._text_file = open(self._text_path, "w", encoding="utf-8")
+        self._started = False  # leading whitespace of the document is dropped...
+        self._pending = ""     # ...and trailing whitespace held back until more text follows
+
+    def add(self, record: dict):
+        self._pages_file.write(("," if self.pages else "") + json.dumps(record))
+        self.pages += 1
+
+        text = page_text(record)
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        body = text.rstrip()
+        if body:
+            self._text_file.write(_json_chars(self._pending + body))
+            self._pending = text[len(body):]
+        else:
+            self._pending += text
+
+    def commit(self) -> bool:
+        """Install the entry; returns False (and stores nothing) if the document had no text."""
+        self._pages_file.close()
+        self._text_file.close()
+        if not self._started:
+            self.abort()
+            return False
+
+        tmp_path = self.cache._tmp_path(self.digest)
+        header = {"sha256": self.digest, "parser_version": PARSER_VERSION, "pdf_backend": PDF_BACKEND}
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write(json.dumps(header)[:-1] + ', "pages": [')
+            for spool, tail in ((self._pages_path, '], "text": "'), (self._text_path, '"}')):
+                with open(spool, "r", encoding="utf-8") as f:
+                    for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), ""):
+                        out.write(chunk)
+                out.write(tail)
+        self.abort()
+        self.cache._install(self.digest, tmp_path)
+        return True
+
+    def abort(self):
+        """Drop the spooled pages."""
+        for f, path in ((self._pages_file, self._pages_path), (self._text_file, self._text_path)):
+            f.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ✅ Shared cache instance
+parse_cache = ParseCache()
+
+
+def parse_rfp_pdf_cached(pdf_path: str, digest: str = None) -> dict:
+    """
+    Parse `pdf_path`, returning a cached result when the same bytes were parsed before.
+    Returns {"text", "pages", "sha256", "cached"}.
+    """
+    digest = digest or sha256_file(pdf_path)
+    entry = parse_cache.get(digest)
+    if entry is not None:
+        logging.info(f"⚡ Parse cache hit for {pdf_path} ({digest[:12]})")
+        return {"text": entry["text"], "pages": entry["pages"], "sha256": digest, "cached": True}
+
+    text, pages = parse_rfp_pdf_with_report(pdf_path)
+    if not text.startswith("Error:"):
+        parse_cache.put(digest, text, pages)
+    return {"text": text, "pages": pages, "sha256": digest, "cached": False}
@@ -1,62 +1,315 @@
 #parse_rfp_pdf.py
 
-import pdfplumber
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-import io
 import logging
+import math
+import multiprocessing
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from backend.ocr_reconcile import reconcile_ocr_text
+from backend.pdf_backends import (
+    PDF_BACKEND, extract_page_records, join_pages, load_pdf, page_count, resolve_backend, text_layer_records,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# pdfplumber, PyMuPDF (fitz) and pytesseract are imported inside the functions that use them,
+# so importing this module (and the API) doesn't pay for them until a PDF is parsed.
+
 # If Tesseract-OCR is not installed at default location, set path manually:
 # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"  # Windows Example
 
-def parse_rfp_pdf(pdf_path: str) -> str:
+# ✅ Bump whenever extraction output changes so cached parses are invalidated
+PARSER_VERSION = "5"
+
+OCR_RESOLUTION = 300
+
+# ✅ Page classification thresholds (selective OCR)
+MIN_TEXT_CHARS = 25             # fewer text-layer chars than this => treat page as scanned
+MIN_IMAGE_AREA_FRACTION = 0.02  # ignore logos/bullets smaller than this share of the page
+MAX_REGION_TEXT_CHARS = 10      # image regions already covered by text-layer chars are skipped
+
+# ✅ Page-parallel extraction settings
+PARSE_WORKERS = int(os.getenv("RFP_PARSE_WORKERS", os.cpu_count() or 1))
+MIN_PAGES_PER_RANGE = 2
+RANGES_PER_WORKER = 4  # smaller ranges balance OCR-heavy pages across workers
+
+# ✅ One pool per worker count, created once under a lock and never shut down while a parse may be using it
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _clip_bbox(bbox, page_bbox):
+    """Clip an (x0, top, x1, bottom) box to the page so pdfplumber can crop it."""
+    x0 = max(bbox[0], page_bbox[0])
+    top = max(bbox[1], page_bbox[1])
+    x1 = min(bbox[2], page_bbox[2])
+    bottom = min(bbox[3], page_bbox[3])
+    if x1 <= x0 or bottom <= top:
+        return None
+    return (x0, top, x1, bottom)
+
+
+def uncovered_image_regions(page_bbox, image_boxes: list, text_boxes: list) -> list:
     """
-    Extract text from a PDF, including images, charts, and graphs using OCR.
-    Uses pdfplumber first (best for structured text), then PyMuPDF (fallback for extracted text),
-    and finally pytesseract OCR for any images.
-    
-    Returns extracted text or an error message if processing fails.
+    The image bboxes (clipped to the page) worth OCR'ing: big enough to matter and not
+    already covered by the text layer. `text_boxes` are (x0, top, x1, bottom, chars).
+    """
+    page_area = max((page_bbox[2] - page_bbox[0]) * (page_bbox[3] - page_bbox[1]), 1)
+    regions = []
+    for box in image_boxes:
+        bbox = _clip_bbox(box, page_bbox)
+        if bbox is None:
+            continue
+        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        if area / page_area < MIN_IMAGE_AREA_FRACTION:
+            continue
+
+        # Text drawn on top of a background image is already in the text layer
+        covered = sum(
+            chars for x0, top, x1, bottom, chars in text_boxes
+            if bbox[0] <= (x0 + x1) / 2 <= bbox[2] and bbox[1] <= (top + bottom) / 2 <= bbox[3]
+        )
+        if covered <= MAX_REGION_TEXT_CHARS:
+            regions.append(bbox)
+    return regions
+
+
+def classify_page(page) -> dict:
+    """
+    Decide how much OCR a pdfplumber page needs.
+
+    Returns a dict with a `decision` of:
+      - "text":        the text layer is complete, no OCR
+      - "ocr_page":    no usable text layer (scanned page), OCR the whole page
+      - "ocr_regions": text layer present, OCR only the embedded images listed in `regions`
+    """
+    text_chars = [c for c in page.chars if c.get("text", "").strip()]
+
+    if len(text_chars) < MIN_TEXT_CHARS:
+        return {"decision": "ocr_page", "text_chars": len(text_chars), "image_count": len(page.images), "regions": []}
+
+    regions = uncovered_image_regions(
+        page.bbox,
+        [(img["x0"], img["top"], img["x1"], img["bottom"]) for img in page.images],
+        [(c["x0"], c["top"], c["x1"], c["bottom"], 1) for c in text_chars],
+    )
+    decision = "ocr_regions" if regions else "text"
+    return {"decision": decision, "text_chars": len(text_chars), "image_count": len(page.images), "regions": regions}
+
+
+def _ocr_image(img) -> str:
+    import pytesseract
+
+    return pytesseract.image_to_string(img)
+
+
+def extract_page(page, page_number: int, page_text: str = None) -> dict:
+    """
+    Extract a single pdfplumber page, running OCR only where `classify_page` says it is needed.
+    `page_text` is the page's text layer if another backend already extracted it.
+    Returns the page text, the OCR text and a report entry with the decision and timings.
+    """
+    start = time.perf_counter()
+    if page_text is None:
+        page_text = page.extract_text() or ""
+    extract_ms = (time.perf_counter() - start) * 1000
+
+    classification = classify_page(page)
+    decision = classification["decision"]
+
+    ocr_start = time.perf_counter()
+    ocr_parts = []
+    if decision == "ocr_page":
+        ocr_parts.append(_ocr_image(page.to_image(resolution=OCR_RESOLUTION).original))
+    elif decision == "ocr_regions":
+        for bbox in classification["regions"]:
+            region = page.crop(bbox).to_image(resolution=OCR_RESOLUTION).original
+            ocr_parts.append(_ocr_image(region))
+    ocr_ms = (time.perf_counter() - ocr_start) * 1000
+
+    ocr_text = "\n".join(part.strip() for part in ocr_parts if part.strip())
+    # ✅ Keep only OCR text the text layer doesn't already have
+    ocr_text, reconcile_stats = reconcile_ocr_text(page_text, ocr_text)
+
+    return {
+        "page": page_number,
+        "text": page_text,
+        "ocr_text": ocr_text,
+        "decision": decision,
+        "text_chars": classification["text_chars"],
+        "image_count": classification["image_count"],
+        "ocr_regions": len(classification["regions"]),
+        "ocr_lines_removed": reconcile_stats["lines_removed"],
+        "ocr_tokens_saved": reconcile_stats["tokens_saved"],
+        "extract_ms": round(extract_ms, 2),
+        "ocr_ms": round(ocr_ms, 2),
+    }
+
+
+def _init_worker():
+    # Each worker already owns a core; stop tesseract from spawning its own threads on top.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _mp_context():
+    # Forking the threaded API server can deadlock children on locks held by other threads
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool for `workers` processes, creating it on first use."""
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, mp_context=_mp_context())
+            _pools[workers] = pool
+        return pool
+
+
+def _page_ranges(page_count: int, workers: int) -> list:
+    """Split `page_count` pages into contiguous [start, end) ranges for the pool."""
+    if page_count <= 0:
+        return []
+    size = max(MIN_PAGES_PER_RANGE, math.ceil(page_count / max(workers * RANGES_PER_WORKER, 1)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _start_range(pool, source, backend: str, start: int, end: int):
+    """
+    Extract pages [start, end) (text layer, then selective OCR) on the pool, or defer
+    the call when running in-process. Returns a future or a callable.
     """
-    extracted_text = ""
+    pages = list(range(start, end))
+    if pool is None:
+        return lambda: extract_page_records(source, backend, pages)
+    return pool.submit(extract_page_records, source, backend, pages)
 
-    # ✅ Step 1: Try extracting structured text with pdfplumber (best for formatted documents)
+
+def _finish_range(data: bytes, start: int, end: int, future) -> list:
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    extracted_text += page_text + "\n"
-
-                # ✅ Extract text from images, graphs, and charts using OCR
-                image = page.to_image(resolution=300)  # Convert PDF page to image
-                img = image.original
-                ocr_text = pytesseract.image_to_string(img)
-                if ocr_text.strip():
-                    extracted_text += "\n[OCR Extracted from Image]\n" + ocr_text + "\n"
-
-        if extracted_text.strip():
-            logging.info(f"✅ Successfully extracted text from {pdf_path} using pdfplumber & OCR.")
-            return extracted_text.strip()
+        return future() if callable(future) else future.result()
     except Exception as e:
-        logging.warning(f"⚠️ pdfplumber & OCR failed on {pdf_path}: {e}")
+        logging.warning(f"⚠️ Extraction failed on pages {start + 1}-{end}: {e}")
+        # Fall back to the fastest text backend's text layer for the range, without OCR
+        return text_layer_records(data, "pymupdf", list(range(start, end)), images=False)
 
-    # ✅ Step 2: Try PyMuPDF (Better for text-based PDFs)
-    try:
-        doc = fitz.open(pdf_path)
-        for page in doc:
-            extracted_text += page.get_text("text") + "\n"
 
-        if extracted_text.strip():
-            logging.info(f"✅ Successfully extracted text from {pdf_path} using PyMuPDF.")
-            return extracted_text.strip()
+def iter_rfp_pages(pdf_path: str, workers: int = None, backend: str = PDF_BACKEND):
+    """
+    Generator version of `parse_rfp_pdf`: yields one record per page, in order, as soon as
+    that page is extracted. Each record has the page text, OCR text, `source`
+    ("text_layer", "ocr" or "text_layer+ocr") and timings.
+    Pages come from the shared `pdf_backends` API (text layer, then selective OCR), so uploads
+    and ingestion get the same text. The parent reads the PDF once to pick the backend;
+    each page range is then extracted on the process pool, whose workers open the file by
+    path rather than receiving its bytes. At most `2 * workers` page ranges are in flight,
+    regardless of document length.
+    """
+    workers = PARSE_WORKERS if workers is None else max(1, workers)
+    data = load_pdf(pdf_path)
+    count = page_count(data)
+    backend = resolve_backend(data, backend, count=count)
+    pool = _get_pool(workers) if workers > 1 else None
+    source = data if pool is None or isinstance(pdf_path, (bytes, bytearray)) else pdf_path
+
+    remaining = iter(_page_ranges(count, workers))
+    pending = deque()
+    for start, end in remaining:
+        pending.append((start, end, _start_range(pool, source, backend, start, end)))
+        if len(pending) >= workers * 2:
+            break
+    while pending:
+        start, end, future = pending.popleft()
+        next_range = next(remaining, None)
+        if next_range is not None:
+            pending.append((*next_range, _start_range(pool, source, backend, *next_range)))
+        yield from _finish_range(data, start, end, future)
+
+
+def parse_rfp_pdf_with_report(pdf_path: str, workers: int = None):
+    """
+    Same as `parse_rfp_pdf` but also returns the per-page report
+    (decision, source, text chars, OCR regions, extraction and OCR timings).
+    Built on `iter_rfp_pages`, so the report and the stream always agree.
+    """
+    workers = PARSE_WORKERS if workers is None else max(1, workers)
+    try:
+        report = list(iter_rfp_pages(pdf_path, workers=workers))
     except Exception as e:
-        logging.warning(f"⚠️ PyMuPDF failed on {pdf_path}: {e}")
+        logging.warning(f"⚠️ Extraction failed on {pdf_path}: {e}")
+        report = []
+
+    extracted_text = join_pages(report)
+    if extracted_text.strip():
+        ocr_pages = sum(1 for r in report if r["decision"] != "text")
+        logging.info(
+            f"✅ Successfully extracted text from {pdf_path} "
+            f"({ocr_pages}/{len(report)} pages needed OCR, {workers} workers, "
+            f"{sum(r['ocr_tokens_saved'] for r in report)} duplicate OCR tokens removed)."
+        )
+        return extracted_text.strip(), report
 
-    # ✅ Step 3: If Both Methods Fail
     logging.error(f"❌ Unable to extract text from {pdf_path}. The PDF may be highly graphical or corrupted.")
-    return "Error: Unable to process the PDF."
+    return "Error: Unable to process the PDF.", report
+
+
+def parse_rfp_pdf(pdf_path: str, workers: int = None) -> str:
+    """
+    Extract text from a PDF, including images, charts, and graphs using OCR.
+    The text layer comes from the PDF_BACKEND backend of `pdf_backends` ("auto": the fastest one
+    with clean text), so the result matches what ingestion extracts from the same file.
+    Pages without a text layer, and pages with images the text layer doesn't cover, are
+    classified and OCR'd with pytesseract: whole scanned pages, or just the image regions. OCR is spread over a process pool of `workers`
+    (default: RFP_PARSE_WORKERS or CPU count); `workers=1` runs in-process. Output is identical either way.
+
+    Returns extracted text or an error message if processing fails.
+    """
+    extracted_text, _ = parse_rfp_pdf_with_report(pdf_path, workers=workers)
+    return extracted_text
+
+
+def summarize_report(report: list) -> dict:
+    """Aggregate a per-page report into decision counts and total timings."""
+    decisions = {}
+    for record in report:
+        decisions[record["decision"]] = decisions.get(record["decision"], 0) + 1
+    return {
+        "pages": len(report),
+        "decisions": decisions,
+        "ocr_regions": sum(r["ocr_regions"] for r in report),
+        "ocr_tokens_saved": sum(r.get("ocr_tokens_saved", 0) for r in report),
+        "extract_ms": round(sum(r["extract_ms"] for r in report), 2),
+        "ocr_ms": round(sum(r["ocr_ms"] for r in report), 2),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python -m backend.parse_rfp_pdf [pdf ...]
+    # Defaults to user_rfp.pdf and the past_rfps/ corpus. Set RFP_PARSE_WORKERS=1 for the sequential baseline.
+    import sys
+
+    paths = sys.argv[1:]
+    if not paths:
+        paths = ["user_rfp.pdf"]
+        if os.path.isdir("past_rfps"):
+            paths += sorted(
+                os.path.join("past_rfps", f) for f in os.listdir("past_rfps") if f.lower().endswith(".pdf")
+            )
+
+    for path in paths:
+        start = time.perf_counter()
+        _, report = parse_rfp_pdf_with_report(path)
+        elapsed = time.perf_counter() - start
+        print(f"\n📄 {path} — {elapsed:.2f}s")
+        for r in report:
+            print(
+                f"  page {r['page']:>4}  {r['decision']:<12} chars={r['text_chars']:<6} "
+                f"images={r['image_count']:<3} regions={r['ocr_regions']:<3} "
+                f"extract={r['extract_ms']:.1f}ms ocr={r['ocr_ms']:.1f}ms saved={r['ocr_tokens_saved']}tok"
+            )
+        print(f"  summary: {summarize_report(report)}")
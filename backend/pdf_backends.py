@@ -0,0 +1,332 @@
+# backend/pdf_backends.py
+
+"""
+One extraction API over swappable PDF backends, shared by ingestion and the upload path.
+
+Backends take the PDF as bytes or as a path. In-process the document is read into
+memory once and every backend works from that buffer; pool workers open the file
+by path instead, so a page range never ships the whole document through a pipe.
+A text backend (PyMuPDF, PyPDF2 or pdfplumber) supplies each page's text layer and
+the text pass also notes embedded images the text layer doesn't cover. Pages
+without a text layer (scanned or figure-only) and pages with such images (charts,
+graphs) go to the selective pdfplumber + pytesseract path from `parse_rfp_pdf`,
+which decides whether to OCR the page or just its image regions. With backend="auto",
+text backends are scored fastest-first on a sample of pages and the first whose
+text passes `text_quality` wins. backend="ocr" runs the selective OCR path on
+every page, image regions on text pages included.
+"""
+
+import io
+import logging
+import os
+import re
+import time
+
+# ✅ Backend used by both ingestion and /rfp uploads unless a caller asks for another
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+
+# Fastest first; "auto" walks this order
+TEXT_BACKENDS = ("pymupdf", "pypdf2", "pdfplumber")
+BACKEND_ORDER = TEXT_BACKENDS + ("ocr",)
+
+MIN_QUALITY = 0.8
+MIN_CHARS_PER_PAGE = 25
+QUALITY_SAMPLE_PAGES = 12
+
+OCR_MARKER = "\n[OCR Extracted from Image]\n"
+
+_CID_ARTIFACT = re.compile(r"\(cid:\d+\)")
+
+
+# --- backends: (pdf bytes or path, 0-based page numbers) -> page texts ----------
+
+def _file(source):
+    """A file object for PDF bytes; paths pass through for libraries that open them lazily."""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _open_fitz(source):
+    import fitz  # PyMuPDF
+
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _pymupdf_pages(source, pages: list) -> list:
+    with _open_fitz(source) as doc:
+        return [doc[i].get_text("text") for i in pages]
+
+
+def _pypdf2_pages(source, pages: list) -> list:
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(_file(source))
+    return [reader.pages[i].extract_text() or "" for i in pages]
+
+
+def _pdfplumber_pages(source, pages: list) -> list:
+    import pdfplumber
+
+    texts = []
+    with pdfplumber.open(_file(source)) as pdf:
+        for i in pages:
+            page = pdf.pages[i]
+            texts.append(page.extract_text() or "")
+            page.flush_cache()
+    return texts
+
+
+def _ocr_source(record: dict) -> str:
+    if record["decision"] == "ocr_page":
+        return "ocr"
+    if record["ocr_text"].strip():
+        return "text_layer+ocr"
+    return "text_layer"
+
+
+def ocr_page_records(source, pages: list, texts: list = None) -> list:
+    """
+    Selective-OCR page records (`parse_rfp_pdf.extract_page`) for the 0-based `pages`.
+    `texts`, when given, are the pages' text layers from another backend and are kept as is.
+    """
+    import pdfplumber
+    from backend.parse_rfp_pdf import extract_page
+
+    records = []
+    with pdfplumber.open(_file(source)) as pdf:
+        for n, i in enumerate(pages):
+            page = pdf.pages[i]
+            record = extract_page(page, i + 1, page_text=texts[n] if texts is not None else None)
+            record["source"] = _ocr_source(record)
+            records.append(record)
+            page.flush_cache()  # drop parsed layout objects so memory stays flat on long documents
+    return records
+
+
+def _ocr_pages(source, pages: list) -> list:
+    return [page_text(record) for record in ocr_page_records(source, pages)]
+
+
+BACKENDS = {
+    "pymupdf": _pymupdf_pages,
+    "pypdf2": _pypdf2_pages,
+    "pdfplumber": _pdfplumber_pages,
+    "ocr": _ocr_pages,
+}
+
+
+# --- embedded images ------------------------------------------------------------
+
+def _pymupdf_layouts(source, pages: list) -> list:
+    from backend.parse_rfp_pdf import uncovered_image_regions
+
+    layouts = []
+    with _open_fitz(source) as doc:
+        for i in pages:
+            page = doc[i]
+            images = [tuple(info["bbox"]) for info in page.get_image_info()]
+            words = [(w[0], w[1], w[2], w[3], len(w[4])) for w in page.get_text("words")]
+            layouts.append((len(images), len(uncovered_image_regions(tuple(page.rect), images, words))))
+    return layouts
+
+
+def _pdfplumber_layouts(source, pages: list) -> list:
+    import pdfplumber
+    from backend.parse_rfp_pdf import uncovered_image_regions
+
+    layouts = []
+    with pdfplumber.open(_file(source)) as pdf:
+        for i in pages:
+            page = pdf.pages[i]
+            images = [(img["x0"], img["top"], img["x1"], img["bottom"]) for img in page.images]
+            chars = [(c["x0"], c["top"], c["x1"], c["bottom"], 1) for c in page.chars if c.get("text", "").strip()]
+            layouts.append((len(images), len(uncovered_image_regions(page.bbox, images, chars))))
+            page.flush_cache()
+    return layouts
+
+
+def page_layouts(source, pages: list) -> list:
+    """
+    (image count, images the text layer doesn't cover) for the 0-based `pages`.
+    Read from PyMuPDF's page geometry whichever backend supplied the text; pdfplumber if it's missing.
+    """
+    try:
+        return _pymupdf_layouts(source, pages)
+    except ImportError:
+        return _pdfplumber_layouts(source, pages)
+
+
+# --- page records ---------------------------------------------------------------
+
+def page_text(record: dict) -> str:
+    """A page record as text: the text layer, then any OCR text after OCR_MARKER. Both paths use this layout."""
+    text = record["text"] + "\n" if record["text"] else ""
+    if record["ocr_text"].strip():
+        text += OCR_MARKER + record["ocr_text"] + "\n"
+    return text
+
+
+def join_pages(records: list) -> str:
+    """Assemble page records into the text layout `parse_rfp_pdf` has always returned."""
+    return "".join(page_text(record) for record in records)
+
+
+def needs_ocr(record: dict) -> bool:
+    """
+    True for a text-layer record whose page has no usable text layer (scanned or figure-only)
+    or carries images the text layer doesn't cover (charts, graphs).
+    """
+    return record["decision"] == "text" and (
+        record["text_chars"] < MIN_CHARS_PER_PAGE or record.get("image_regions", 0) > 0
+    )
+
+
+def text_layer_records(source, backend: str, pages: list, images: bool = True) -> list:
+    """
+    Page records for the 0-based `pages` from a text backend (no OCR yet); backend="ocr" OCRs them all.
+    With `images`, each record also counts the page's images and those the text layer doesn't cover.
+    """
+    if backend == "ocr":
+        return ocr_page_records(source, pages)
+    started = time.perf_counter()
+    texts = BACKENDS[backend](source, pages)
+    layouts = page_layouts(source, pages) if images else [(0, 0)] * len(texts)
+    extract_ms = round((time.perf_counter() - started) * 1000 / max(len(texts), 1), 2)
+    return [
+        {
+            "page": i + 1, "text": text, "ocr_text": "", "source": "text_layer", "decision": "text",
+            "text_chars": len("".join(text.split())), "image_count": image_count, "image_regions": regions,
+            "ocr_regions": 0, "ocr_lines_removed": 0, "ocr_tokens_saved": 0, "extract_ms": extract_ms,
+            "ocr_ms": 0.0,
+        }
+        for i, text, (image_count, regions) in zip(pages, texts, layouts)
+    ]
+
+
+def fill_ocr(records: list, ocr_records: list) -> list:
+    """Swap in the OCR records of pages that needed OCR, keeping the text pass's timing."""
+    by_page = {record["page"]: record for record in ocr_records}
+    return [
+        {**by_page[record["page"]], "extract_ms": record["extract_ms"] + by_page[record["page"]]["extract_ms"]}
+        if record["page"] in by_page else record
+        for record in records
+    ]
+
+
+def extract_page_records(source, backend: str, pages: list) -> list:
+    """
+    Text-layer records for `pages`; pages without a text layer or with uncovered images are
+    handed to selective OCR, which keeps the backend's text and adds what it finds in the images.
+    `source` is the PDF's bytes or its path (what page-parallel workers get).
+    """
+    records = text_layer_records(source, backend, pages)
+    missing = [record for record in records if needs_ocr(record)]
+    if not missing:
+        return records
+    try:
+        ocr_records = ocr_page_records(
+            source, [record["page"] - 1 for record in missing], [record["text"] for record in missing]
+        )
+    except Exception as e:
+        logging.warning(f"⚠️ OCR failed on {len(missing)} pages: {e}")
+        return records
+    return fill_ocr(records, ocr_records)
+
+
+# --- backend selection ------------------------------------------------------------
+
+def text_quality(pages: list) -> float:
+    """
+    Score a text layer from 0 to 1: the share of its text that is not extraction
+    garbage (replacement characters, `(cid:N)` glyph ids, control characters).
+    Pages without a text layer don't count against a backend; they are OCR'd on their own.
+    """
+    text = "".join(p for p in pages if len(p.strip()) >= MIN_CHARS_PER_PAGE)
+    if not text:
+        return 0.0
+
+    garbage = text.count("�") + sum(len(m) for m in _CID_ARTIFACT.findall(text))
+    garbage += sum(1 for c in text if not c.isprintable() and c not in "\n\t\r")
+    return round(1.0 - garbage / len(text), 4)
+
+
+def load_pdf(source) -> bytes:
+    """Read a PDF path (or pass through bytes) so the file is opened exactly once."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def page_count(data: bytes) -> int:
+    try:
+        with _open_fitz(data) as doc:
+            return doc.page_count
+    except Exception:
+        import pdfplumber
+
+        with pdfplumber.open(_file(data)) as pdf:
+            return len(pdf.pages)
+
+
+def sample_pages(count: int, size: int = QUALITY_SAMPLE_PAGES) -> list:
+    """Up to `size` page numbers spread evenly over the document."""
+    if count <= size:
+        return list(range(count))
+    return sorted({round(i * (count - 1) / (size - 1)) for i in range(size)})
+
+
+def resolve_backend(data: bytes, backend: str = PDF_BACKEND, min_quality: float = MIN_QUALITY,
+                    count: int = None) -> str:
+    """
+    The backend to extract with. "auto" scores the text backends fastest-first on a
+    sample of pages and takes the first reaching `min_quality`, otherwise the best one.
+    """
+    if backend != "auto":
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend '{backend}'. Choose from: auto, {', '.join(BACKENDS)}")
+        return backend
+
+    sample = sample_pages(page_count(data) if count is None else count)
+    best, best_quality = None, -1.0
+    for name in TEXT_BACKENDS:
+        try:
+            texts = BACKENDS[name](data, sample)
+        except Exception as e:
+            logging.warning(f"⚠️ {name} failed to extract PDF: {e}")
+            continue
+        quality = text_quality(texts)
+        if quality > best_quality:
+            best, best_quality = name, quality
+        # A scanned document has no text layer for any backend to find; its pages go to OCR
+        if quality >= min_quality or not any(len(t.strip()) >= MIN_CHARS_PER_PAGE for t in texts):
+            break
+
+    if best is None:
+        return "ocr"
+    logging.info(f"✅ Using {best} for the text layer (quality {best_quality} on {len(sample)} sampled pages).")
+    return best
+
+
+def extract_pdf_pages(source, backend: str = PDF_BACKEND, min_quality: float = MIN_QUALITY,
+                      ocr: bool = True) -> dict:
+    """
+    Extract per-page text from a PDF path or bytes.
+    Returns {"backend", "pages", "records", "quality"}; `pages` are `page_text` strings.
+    Pages without a text layer or with uncovered images are OCR'd unless `ocr=False`.
+    """
+    data = load_pdf(source)
+    count = page_count(data)
+    name = resolve_backend(data, backend, min_quality, count)
+    pages = list(range(count))
+    records = extract_page_records(data, name, pages) if ocr else text_layer_records(data, name, pages, images=False)
+    texts = [page_text(record) for record in records]
+    quality = text_quality([record["text"] for record in records])
+    logging.info(f"✅ Extracted {len(texts)} pages with {name} (quality {quality}).")
+    return {"backend": name, "pages": texts, "records": records, "quality": quality}
+
+
+def extract_pdf_text(source, backend: str = PDF_BACKEND) -> str:
+    """Extract a PDF's text, one page after another, via `extract_pdf_pages`."""
+    return join_pages(extract_pdf_pages(source, backend=backend)["records"]).strip()
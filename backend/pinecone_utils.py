@@ -1,39 +1,39 @@
 # backend/pinecone_utils.py
 
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Index
-from embeddings_setup import embeddings
-from dotenv import load_dotenv
-load_dotenv()  
-import os
+from backend.providers import get_retrieval_service, PINECONE_INDEX_NAME
+from backend.retrieval import RETRIEVAL_MODE
 import logging
 
 # ✅ Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# ✅ Load Pinecone API settings
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-pinecone_host = os.getenv("PINECONE_HOST")
-index_name = "my-proposals-index"
-
-# ✅ Initialize Pinecone index
-index = Index(api_key=pinecone_api_key, host=pinecone_host, name=index_name)
+index_name = PINECONE_INDEX_NAME
 
 # ✅ Function to retrieve similar documents
-def retrieve_similar_docs(query: str, top_k: int = 3):
-    """ Retrieves relevant RFP documents from Pinecone using similarity search. """
+def retrieve_similar_docs(query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE):
+    """ Retrieves relevant RFP documents from Pinecone using similarity search (one query embedding per call).
+    mode="hybrid" fuses the dense results with the local BM25 keyword index. """
     try:
-        # ✅ Print embedding shape before querying Pinecone
-        vector = embeddings.embed_query(query)
-        print(f"🔍 Generated embedding vector shape: {len(vector)}")  # Should be 1536
-        # Initialize PineconeVectorStore
-        vector_store = PineconeVectorStore(index_name=index_name, embedding=embeddings)
+        retrieved_texts = get_retrieval_service().retrieve(query, top_k=top_k, mode=mode)
 
-        # Perform similarity search
-        docs = vector_store.similarity_search(query, k=top_k)
+        if retrieved_texts:
+            logging.info(f"✅ Retrieved Documents:\n{retrieved_texts}")
+            return retrieved_texts
+        else:
+            logging.warning("⚠️ No similar documents found.")
+            return ["No similar documents found."]
+    except Exception as e:
+        logging.error(f"❌ Error retrieving documents: {str(e)}")
+        return [f"Error retrieving documents: {str(e)}"]
+
+
+# ✅ Async variant for the async proposal routes (same results and error strings)
+async def aretrieve_similar_docs(query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE):
+    """ Retrieves relevant RFP documents without blocking the event loop. """
+    try:
+        retrieved_texts = await get_retrieval_service().aretrieve(query, top_k=top_k, mode=mode)
 
-        if docs:
-            retrieved_texts = [doc.page_content for doc in docs]
+        if retrieved_texts:
             logging.info(f"✅ Retrieved Documents:\n{retrieved_texts}")
             return retrieved_texts
         else:
@@ -42,6 +42,16 @@ def retrieve_similar_docs(query: str, top_k: int = 3):
     except Exception as e:
         logging.error(f"❌ Error retrieving documents: {str(e)}")
         return [f"Error retrieving documents: {str(e)}"]
-    
-    
-    
\ No newline at end of file
+
+
+# ✅ Function to retrieve documents for many queries at once
+def retrieve_similar_docs_batch(queries: list, top_k: int = 3, mode: str = RETRIEVAL_MODE):
+    """ Retrieves documents for each query with one batched embedding call; results keep input order
+    and a failed query reports its own error. """
+    results = []
+    for query, outcome in zip(queries, get_retrieval_service().search_many(queries, top_k=top_k, mode=mode)):
+        if isinstance(outcome, Exception):
+            results.append({"query": query, "error": f"Error retrieving documents: {str(outcome)}"})
+        else:
+            results.append({"query": query, "retrieved_docs": [m["text"] for m in outcome] or ["No similar documents found."]})
+    return results
@@ -0,0 +1,103 @@
+# backend/providers.py
+
+"""
+Shared, lazily created clients.
+
+Nothing heavy (langchain, pinecone, OpenAI clients) is imported or constructed
+until first use, so importing the API process stays fast; every caller then
+shares the same instance.
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+
+from dotenv import load_dotenv
+load_dotenv()
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "my-proposals-index")
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone")  # "pinecone", "local" (exact) or "ivf" (ANN)
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """The one ChatOpenAI client used for generation and refinement."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        model_name=LLM_MODEL,
+        temperature=0.0
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embeddings():
+    """Cached OpenAI embeddings (1536 dimensions, matches the Pinecone index)."""
+    from langchain_openai import OpenAIEmbeddings
+    from backend.embedding_cache import CachedEmbeddings
+    from backend.embeddings_setup import EMBEDDING_MODEL
+
+    return CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), model=EMBEDDING_MODEL)
+
+
+@lru_cache(maxsize=None)
+def get_pinecone_index():
+    """Pinecone index client for the proposals index."""
+    from pinecone import Index
+
+    return Index(api_key=os.getenv("PINECONE_API_KEY"), host=os.getenv("PINECONE_HOST"), name=PINECONE_INDEX_NAME)
+
+
+@lru_cache(maxsize=None)
+def get_vector_index():
+    """The configured vector index: Pinecone, or the local NumPy store (exact or IVF)."""
+    if VECTOR_STORE == "local":
+        from backend.quantization import QuantizedVectorStore, VECTOR_QUANTIZATION
+        from backend.vector_store import LocalVectorStore
+
+        # ✅ VECTOR_QUANTIZATION=int8/pq keeps compact codes in RAM and re-scores in float32
+        return LocalVectorStore() if VECTOR_QUANTIZATION == "none" else QuantizedVectorStore()
+    if VECTOR_STORE == "ivf":
+        from backend.ann_index import IVFVectorStore
+
+        return IVFVectorStore()
+    if VECTOR_STORE != "pinecone":
+        raise ValueError(f"Unknown VECTOR_STORE '{VECTOR_STORE}'.")
+    return get_pinecone_index()
+
+
+@lru_cache(maxsize=None)
+def get_sparse_index():
+    """BM25 keyword index built during ingestion (kept inside the local store's directory when one is used)."""
+    from backend.bm25_index import BM25Index, BM25_INDEX_PATH
+
+    if VECTOR_STORE == "pinecone":
+        return BM25Index(BM25_INDEX_PATH)
+    return BM25Index(os.path.join(get_vector_index().path, "bm25_index.pkl"))
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_service():
+    """Shared RetrievalService over the configured index, BM25 index and cached embeddings, with a result cache."""
+    from backend.retrieval import RetrievalService
+    from backend.retrieval_cache import retrieval_cache
+
+    return RetrievalService(get_vector_index(), get_embeddings(), get_sparse_index(), cache=retrieval_cache)
+
+
+def warm_up(background: bool = True):
+    """Create the shared clients ahead of the first request (optionally on a background thread)."""
+    def run():
+        for provider in (get_llm, get_embeddings, get_vector_index, get_retrieval_service):
+            try:
+                provider()
+            except Exception as e:
+                logging.warning(f"⚠️ Warm-up of {provider.__name__} failed: {e}")
+
+    if background:
+        threading.Thread(target=run, name="provider-warm-up", daemon=True).start()
+    else:
+        run()
@@ -0,0 +1,253 @@
+# backend/quantization.py
+
+"""
+Compact in-memory codes for the local vector store, with exact re-scoring.
+
+`QuantizedVectorStore` keeps only quantized codes in RAM and scores every live row
+against them. It then re-scores the best `rerank_candidates` rows exactly, using the
+float32 memmap on disk, which is paged in only for those rows. Codes per vector at
+1536 dims:
+
+    int8      1 byte per dimension + scale   1540 B   (4x smaller than 6144 B float32)
+    pq        1 byte per sub-vector          192 B    (32x, PQ_SUBVECTORS=192)
+
+On top of the codes, every store keeps each id, its dict entry and a log offset
+resident (about 100 B per vector; see `memory_usage`). Metadata and chunk text stay
+on disk. So the whole-store saving is about 3.8x for int8 and 20x for pq.
+
+Product quantization splits each vector into PQ_SUBVECTORS pieces, and each piece is
+coded as one of 256 k-means centroids, so it must be trained on a sample first.
+Until it is trained, search stays exact.
+"""
+
+import logging
+import os
+
+import numpy as np
+
+from backend.ann_index import assign_to_centroids, kmeans
+from backend.vector_store import LocalVectorStore, top_k_indices
+
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")  # none, int8 or pq
+QUANT_RERANK_CANDIDATES = int(os.getenv("QUANT_RERANK_CANDIDATES", 256))
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", 192))
+PQ_MIN_TRAIN_VECTORS = int(os.getenv("PQ_MIN_TRAIN_VECTORS", 10000))
+PQ_TRAIN_SAMPLE = 50000
+PQ_CENTROIDS = 256
+SAVE_EVERY = 10000  # unsaved codes before quantized_<codec>.npz is rewritten
+SCORE_BATCH = 8192
+
+
+def _append(buffer: np.ndarray, used: int, rows: np.ndarray) -> np.ndarray:
+    """Write `rows` after the first `used` rows of `buffer`, doubling its capacity when full."""
+    if used + len(rows) > len(buffer):
+        grown = np.empty((max(2 * len(buffer), used + len(rows)),) + buffer.shape[1:], dtype=buffer.dtype)
+        grown[:used] = buffer[:used]
+        buffer = grown
+    buffer[used:used + len(rows)] = rows
+    return buffer
+
+
+class Int8Codec:
+    """Symmetric per-vector int8: x ≈ codes * scale, scale = max|x| / 127."""
+
+    trained = True
+
+    def __init__(self, dimension: int):
+        self.count = 0
+        self._codes = np.empty((0, dimension), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self.count]
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self._codes.shape[1] + 4
+
+    def add(self, matrix: np.ndarray):
+        scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127
+        self._codes = _append(self._codes, self.count, np.round(matrix / scales[:, None]).astype(np.int8))
+        self._scales = _append(self._scales, self.count, scales.astype(np.float32))
+        self.count += len(matrix)
+
+    def scores(self, rows: slice, query: np.ndarray) -> np.ndarray:
+        return (self._codes[rows].astype(np.float32) @ query) * self._scales[rows]
+
+    def state(self) -> dict:
+        return {"codes": self.codes, "scales": self._scales[:self.count]}
+
+    def restore(self, state):
+        self._codes, self._scales = state["codes"], state["scales"]
+        self.count = len(self._codes)
+
+    def truncate(self, rows: int):
+        self.count = min(self.count, rows)
+
+
+class ProductCodec:
+    """Product quantization: one uint8 centroid id per sub-vector, scored with lookup tables."""
+
+    def __init__(self, dimension: int, subvectors: int = PQ_SUBVECTORS):
+        if dimension % subvectors:
+            raise ValueError(f"PQ_SUBVECTORS={subvectors} must divide the dimension {dimension}.")
+        self.subvectors = subvectors
+        self.sub_dimension = dimension // subvectors
+        self.codebooks = None  # (subvectors, 256, sub_dimension)
+        self.count = 0
+        self._codes = np.empty((0, subvectors), dtype=np.uint8)
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self.count]
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.subvectors
+
+    def train(self, sample: np.ndarray):
+        parts = sample.reshape(len(sample), self.subvectors, self.sub_dimension)
+        self.codebooks = np.stack([
+            kmeans(parts[:, i], PQ_CENTROIDS, spherical=False, seed=i) for i in range(self.subvectors)
+        ])
+
+    def add(self, matrix: np.ndarray):
+        parts = matrix.reshape(len(matrix), self.subvectors, self.sub_dimension)
+        codes = np.stack([
+            assign_to_centroids(parts[:, i], self.codebooks[i], spherical=False) for i in range(self.subvectors)
+        ], axis=1).astype(np.uint8)
+        self._codes = _append(self._codes, self.count, codes)
+        self.count += len(codes)
+
+    def scores(self, rows: slice, query: np.ndarray) -> np.ndarray:
+        # Inner product of the query with every centroid of every sub-space, then a gather per row
+        table = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.subvectors, self.sub_dimension))
+        return table[np.arange(self.subvectors), self._codes[rows]].sum(axis=1)
+
+    def state(self) -> dict:
+        return {"codes": self.codes, "codebooks": self.codebooks}
+
+    def restore(self, state):
+        self._codes, self.codebooks = state["codes"], state["codebooks"]
+        self.count = len(self._codes)
+
+    def truncate(self, rows: int):
+        self.count = min(self.count, rows)
+
+
+# float16 was dropped: numpy's half-to-float conversion made its scan ~15x slower than
+# exact float32 search, at twice int8's memory
+CODECS = {"int8": Int8Codec, "pq": ProductCodec}
+
+
+class QuantizedVectorStore(LocalVectorStore):
+    """LocalVectorStore that searches compact codes and re-scores the top candidates in float32."""
+
+    def __init__(self, *args, quantization: str = VECTOR_QUANTIZATION,
+                 rerank_candidates: int = QUANT_RERANK_CANDIDATES, **kwargs):
+        if quantization not in CODECS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Choose from {sorted(CODECS)}.")
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+        super().__init__(*args, **kwargs)
+        self._codes_path = os.path.join(self.path, f"quantized_{quantization}.npz")
+        self._load_codes()
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.codec.bytes_per_vector
+
+    def memory_usage(self) -> dict:
+        usage = super().memory_usage()
+        usage["codes"] = self.codec.count * self.codec.bytes_per_vector
+        return usage
+
+    # --- encoding / persistence ----------------------------------------------------
+
+    def _encode_rows(self, start: int):
+        """Encode every stored row from `start` on, streaming through the memmap."""
+        for offset in range(start, len(self._ids), SCORE_BATCH):
+            self.codec.add(np.asarray(self._matrix[offset:offset + SCORE_BATCH]))
+        self._unsaved += len(self._ids) - start
+
+    def _train(self):
+        live = np.flatnonzero(self._alive)
+        sample = np.sort(np.random.default_rng(0).choice(live, min(len(live), PQ_TRAIN_SAMPLE), replace=False))
+        self.codec.train(np.asarray(self._matrix[sample]))
+        logging.info(f"✅ Trained product quantizer on {len(sample)} vectors")
+        self._encode_rows(0)
+        self.save()
+
+    def save(self):
+        """Write the codes (and PQ codebooks) next to the vectors."""
+        with self._lock:
+            if not self.codec.trained:
+                return
+            tmp = self._codes_path + ".tmp.npz"
+            np.savez(tmp, generation=self._meta_generation(), **self.codec.state())
+            os.replace(tmp, self._codes_path)
+            self._unsaved = 0
+
+    def _load_codes(self):
+        self.codec = CODECS[self.quantization](self.dimension)
+        self._unsaved = 0
+        if os.path.exists(self._codes_path):
+            saved = dict(np.load(self._codes_path))
+            self.codec.restore(saved)
+            if int(saved["generation"]) != self._meta_generation() or self.codec.count > len(self._ids):
+                self.codec.truncate(0)
+        if not self.codec.trained:
+            if self._alive.sum() >= PQ_MIN_TRAIN_VECTORS:
+                self._train()
+            return
+        # Only rows appended since the last save need encoding
+        self._encode_rows(self.codec.count)
+        logging.info(f"✅ Loaded {self.quantization} codes: {self.codec.count} vectors, "
+                     f"{self.bytes_per_vector} bytes/vector")
+
+    # --- store hooks ---------------------------------------------------------------
+
+    def _on_upsert(self, first_row: int, matrix: np.ndarray):
+        if not self.codec.trained:
+            if self._alive.sum() >= PQ_MIN_TRAIN_VECTORS:
+                self._train()
+            return
+        self.codec.add(matrix)
+        self._unsaved += len(matrix)
+        if self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def _on_reset(self):
+        # delete_all or compact(): row numbers changed, so re-encode (keeping any PQ codebooks)
+        self.codec.truncate(0)
+        if self.codec.trained:
+            self._encode_rows(0)
+            self.save()
+
+    def _on_reload(self):
+        # The writer process saves its codes under the new log generation; use them if they match
+        self._load_codes()
+
+    # --- search --------------------------------------------------------------------
+
+    def _search(self, query: np.ndarray, top_k: int):
+        if not self.codec.trained:
+            return super()._search(query, top_k)
+        live_count = int(self._alive.sum())
+        if not live_count:
+            return [], []
+        # Contiguous slices of the codes, not gathers; dead rows are masked afterwards
+        approx = np.concatenate([
+            self.codec.scores(slice(start, min(start + SCORE_BATCH, self.codec.count)), query)
+            for start in range(0, self.codec.count, SCORE_BATCH)
+        ])
+        approx[~self._alive] = -np.inf
+        candidates = np.sort(top_k_indices(approx, min(max(top_k, self.rerank_candidates), live_count)))
+        exact = self._matrix[candidates] @ query
+        best = top_k_indices(exact, top_k)
+        return candidates[best].tolist(), exact[best].tolist()
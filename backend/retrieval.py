@@ -0,0 +1,309 @@
+# backend/retrieval.py
+
+"""
+Long-lived retrieval service: one query embedding per retrieval, then a direct
+vector query against an index client that is created once and keeps its
+HTTP connection pool between requests.
+
+Modes: "dense" (vector similarity only), "hybrid" (dense results fused with the
+local BM25 keyword index by reciprocal rank fusion) and "multi" (a long RFP split
+into sections, one query per section, merged with maximal marginal relevance).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+PROPOSAL_RETRIEVAL_MODE = os.getenv("PROPOSAL_RETRIEVAL_MODE", "multi")  # used for whole RFPs
+RETRIEVAL_MODES = ("dense", "hybrid", "multi")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))  # per retriever, before fusion
+RRF_K = 60
+
+MULTI_QUERY_SECTION_TOKENS = int(os.getenv("MULTI_QUERY_SECTION_TOKENS", 300))
+MULTI_QUERY_MAX_SECTIONS = int(os.getenv("MULTI_QUERY_MAX_SECTIONS", 16))
+MULTI_QUERY_PER_SECTION = int(os.getenv("MULTI_QUERY_PER_SECTION", 5))
+MULTI_QUERY_CONCURRENCY = int(os.getenv("MULTI_QUERY_CONCURRENCY", 8))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))  # 1.0 = pure relevance, 0.0 = pure diversity
+
+# ✅ Shared pool for concurrent per-section vector queries
+_query_executor = ThreadPoolExecutor(max_workers=MULTI_QUERY_CONCURRENCY, thread_name_prefix="vector-query")
+
+
+def _field(obj, name, default=None):
+    """Read a field from a Pinecone response object or a plain dict."""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = RRF_K) -> list:
+    """Fuse ranked id lists: score(id) = sum of 1 / (k + rank). Returns [(id, score)], best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def _as_match(vector_id, score, metadata) -> dict:
+    metadata = dict(metadata or {})
+    return {"id": vector_id, "score": score, "text": metadata.pop("text", ""), "metadata": metadata}
+
+
+def split_sections(text: str, section_tokens: int = MULTI_QUERY_SECTION_TOKENS,
+                   max_sections: int = MULTI_QUERY_MAX_SECTIONS) -> list:
+    """Heading-aware sections of an RFP, coarsened until there are at most `max_sections`."""
+    from backend.chunker import chunk_text
+    from backend.tokens import count_tokens
+
+    section_tokens = max(section_tokens, -(-count_tokens(text) // max_sections))
+    sections = [c["text"] for c in chunk_text(text, "query", chunk_tokens=section_tokens, overlap_tokens=0)]
+    # Headings force a split, so a heading-heavy RFP can still exceed the cap: merge neighbours
+    while len(sections) > max_sections:
+        sections = ["\n".join(sections[i:i + 2]) for i in range(0, len(sections), 2)]
+    return sections or [text]
+
+
+def mmr_select(candidates: list, top_k: int, mmr_lambda: float = MMR_LAMBDA) -> list:
+    """
+    Maximal marginal relevance over matches carrying "values": repeatedly pick the
+    candidate maximizing lambda * relevance - (1 - lambda) * max similarity to those picked.
+    """
+    import numpy as np
+
+    if len(candidates) <= 1:
+        return candidates[:top_k]
+    vectors = np.asarray([c["values"] for c in candidates], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    relevance = np.asarray([c["score"] for c in candidates], dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < min(top_k, len(candidates)):
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return [candidates[i] for i in selected]
+
+
+class RetrievalService:
+    def __init__(self, index, embeddings, sparse_index=None, cache=None):
+        self.index = index
+        self.embeddings = embeddings
+        self.sparse_index = sparse_index
+        self.cache = cache
+
+    def embed_query(self, query: str) -> list:
+        return self.embeddings.embed_query(query)
+
+    def query_vector(self, vector: list, top_k: int = 3, include_values: bool = False) -> list:
+        """Query the index by vector. Returns [{"id", "score", "text", "metadata"[, "values"]}], best first."""
+        response = self.index.query(vector=vector, top_k=top_k, include_metadata=True, include_values=include_values)
+        matches = []
+        for match in _field(response, "matches", []) or []:
+            matches.append(_as_match(_field(match, "id"), _field(match, "score"), _field(match, "metadata", {})))
+            if include_values:
+                matches[-1]["values"] = list(_field(match, "values", []) or [])
+        return matches
+
+    def fetch(self, ids: list) -> dict:
+        """{id: match} for chunks looked up by id (score None)."""
+        if not ids:
+            return {}
+        vectors = _field(self.index.fetch(ids=ids), "vectors", {}) or {}
+        return {i: _as_match(i, None, _field(v, "metadata", {})) for i, v in vectors.items()}
+
+    def _resolve_mode(self, mode: str) -> str:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Choose from {RETRIEVAL_MODES}.")
+        return "dense" if mode == "hybrid" and self.sparse_index is None else mode
+
+    def _cached(self, query: str, top_k: int, mode: str):
+        """(cache key, cached matches or None); the key is None when caching is off."""
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(query, top_k, mode)
+        return key, self.cache.get(key)
+
+    def _search_uncached(self, query: str, top_k: int, mode: str, vector: list = None) -> list:
+        if mode == "hybrid":
+            return self.hybrid_search(query, top_k, vector=vector)
+        if mode == "multi":
+            return self.multi_query_search(query, top_k)
+        return self.dense_search(query, top_k, vector=vector)
+
+    def search(self, query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> list:
+        """Top_k matches for `query`, from the retrieval cache when the index has not changed."""
+        mode = self._resolve_mode(mode)
+        key, cached = self._cached(query, top_k, mode)
+        if cached is not None:
+            logging.info(f"🔍 Retrieval cache hit: {len(cached)} matches")
+            return cached
+        matches = self._search_uncached(query, top_k, mode)
+        if key is not None:
+            self.cache.put(key, matches)
+        return matches
+
+    def search_many(self, queries: list, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> list:
+        """
+        Matches for many queries, in input order. Cache misses are embedded in one batched
+        call and their vector lookups run concurrently. A query that fails (including its
+        embedding) gets its exception in its slot instead of failing the batch.
+        """
+        mode = self._resolve_mode(mode)
+        started = time.perf_counter()
+        results, keys, pending = [None] * len(queries), {}, {}
+        for i, query in enumerate(queries):
+            key, cached = self._cached(query, top_k, mode)
+            if cached is not None:
+                results[i] = cached
+            else:
+                keys[query] = key
+                pending.setdefault(query, []).append(i)  # identical queries are looked up once
+
+        unique = list(pending)
+        vectors = [None] * len(unique)
+        if unique and mode != "multi":
+            vectors = self._embed_many(unique)
+
+        def run(query, vector):
+            if isinstance(vector, Exception):
+                return vector
+            try:
+                matches = self._search_uncached(query, top_k, mode, vector=vector)
+            except Exception as e:
+                logging.warning(f"⚠️ Batch retrieval failed for one query: {e}")
+                return e
+            if keys[query] is not None:
+                self.cache.put(keys[query], matches)
+            return matches
+
+        # Multi-query mode fans out on the shared pool itself, so its queries run one after another
+        outcomes = map(run, unique, vectors) if mode == "multi" else _query_executor.map(run, unique, vectors)
+        for query, outcome in zip(unique, outcomes):
+            for i in pending[query]:
+                results[i] = [dict(m) for m in outcome] if isinstance(outcome, list) else outcome
+        logging.info(
+            f"🔍 Batch retrieval: {len(queries)} queries, {len(queries) - sum(map(len, pending.values()))} cached, "
+            f"{len(unique)} looked up in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return results
+
+    def _embed_many(self, queries: list) -> list:
+        """
+        Embed `queries` in one call. If the service rejects the batch's input, retry each
+        half so only the offending queries get their exception in place of a vector.
+        Rate limits, timeouts and outages fail the whole batch at once: splitting would
+        only multiply requests against a service that is already struggling.
+        """
+        from backend.ingest_pipeline import is_input_error
+
+        try:
+            return self.embeddings.embed_documents(queries)
+        except Exception as e:
+            if len(queries) == 1 or not is_input_error(e):
+                logging.warning(f"⚠️ Embedding failed for {len(queries)} queries: {e}")
+                return [e] * len(queries)
+        middle = len(queries) // 2
+        return self._embed_many(queries[:middle]) + self._embed_many(queries[middle:])
+
+    def dense_search(self, query: str, top_k: int = 3, vector: list = None) -> list:
+        """Embed `query` once (unless its vector is given) and return the top_k vector matches."""
+        started = time.perf_counter()
+        vector = vector if vector is not None else self.embed_query(query)
+        embedded = time.perf_counter()
+        matches = self.query_vector(vector, top_k=top_k)
+        logging.info(
+            f"🔍 Retrieval: embed {(embedded - started) * 1000:.0f} ms, "
+            f"query {(time.perf_counter() - embedded) * 1000:.0f} ms, {len(matches)} matches"
+        )
+        return matches
+
+    def hybrid_search(self, query: str, top_k: int = 3, vector: list = None) -> list:
+        """Dense and BM25 candidates fused by reciprocal rank; scores are RRF scores."""
+        depth = max(top_k, HYBRID_CANDIDATES)
+        started = time.perf_counter()
+        sparse = self.sparse_index.query(query, top_k=depth)
+        sparse_done = time.perf_counter()
+        dense = self.query_vector(vector if vector is not None else self.embed_query(query), top_k=depth)
+        dense_done = time.perf_counter()
+
+        fused = reciprocal_rank_fusion([[m["id"] for m in dense], [doc_id for doc_id, _ in sparse]])[:top_k]
+        by_id = {m["id"]: m for m in dense}
+        # Keyword-only hits are not in the dense results, so fetch their text from the index
+        by_id.update(self.fetch([doc_id for doc_id, _ in fused if doc_id not in by_id]))
+        matches = [dict(by_id[doc_id], score=score) for doc_id, score in fused if doc_id in by_id]
+        logging.info(
+            f"🔍 Hybrid retrieval: bm25 {(sparse_done - started) * 1000:.2f} ms ({len(sparse)} hits), "
+            f"dense {(dense_done - sparse_done) * 1000:.0f} ms, {len(matches)} fused matches"
+        )
+        return matches
+
+    def multi_query_search(self, text: str, top_k: int = 3, sections: list = None, vectors: list = None) -> list:
+        """
+        One query per RFP section: all sections embedded in one batch, the vector queries
+        run concurrently, and the pooled candidates de-duplicated with MMR so the top_k
+        cover different requirements instead of repeating the closest one.
+        """
+        started = time.perf_counter()
+        if vectors is None:
+            sections = split_sections(text)
+            vectors = self.embeddings.embed_documents(sections)
+        embedded = time.perf_counter()
+        per_section = max(top_k, MULTI_QUERY_PER_SECTION)
+        results = list(_query_executor.map(
+            lambda vector: self.query_vector(vector, top_k=per_section, include_values=True), vectors
+        ))
+        queried = time.perf_counter()
+
+        # A chunk hit by several sections keeps its best score
+        pooled = {}
+        for match in (m for section_matches in results for m in section_matches):
+            if match["id"] not in pooled or match["score"] > pooled[match["id"]]["score"]:
+                pooled[match["id"]] = match
+        candidates = list(pooled.values())
+        if all(m["values"] for m in candidates):
+            matches = mmr_select(candidates, top_k)
+        else:  # the index returned no vectors, so rank by relevance alone
+            matches = sorted(candidates, key=lambda m: m["score"], reverse=True)[:top_k]
+        for match in matches:
+            match.pop("values", None)
+        logging.info(
+            f"🔍 Multi-query retrieval: {len(sections)} sections, embed {(embedded - started) * 1000:.0f} ms, "
+            f"queries {(queried - embedded) * 1000:.0f} ms, {len(pooled)} candidates -> {len(matches)} matches"
+        )
+        return matches
+
+    def retrieve(self, query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> list:
+        """Texts of the top_k matches for `query`."""
+        return [match["text"] for match in self.search(query, top_k=top_k, mode=mode)]
+
+    async def asearch(self, query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> list:
+        """
+        Async search: the query embedding is awaited on the async client, and the
+        blocking index lookups run in worker threads, so the event loop never waits on them.
+        """
+        mode = self._resolve_mode(mode)
+        key, cached = await asyncio.to_thread(self._cached, query, top_k, mode)
+        if cached is not None:
+            logging.info(f"🔍 Retrieval cache hit: {len(cached)} matches")
+            return cached
+        if mode == "multi":
+            sections = await asyncio.to_thread(split_sections, query)
+            vectors = await self.embeddings.aembed_documents(sections)
+            matches = await asyncio.to_thread(self.multi_query_search, query, top_k, sections, vectors)
+        else:
+            vector = await self.embeddings.aembed_query(query)
+            matches = await asyncio.to_thread(self._search_uncached, query, top_k, mode, vector)
+        if key is not None:
+            self.cache.put(key, matches)
+        return matches
+
+    async def aretrieve(self, query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> list:
+        return [match["text"] for match in await self.asearch(query, top_k=top_k, mode=mode)]
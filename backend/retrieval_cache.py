@@ -0,0 +1,111 @@
+# backend/retrieval_cache.py
+
+"""
+In-process TTL + LRU cache of retrieval results.
+
+Entries are keyed by (normalized query hash, top_k, mode, index version). The index
+version is the mtime of a small stamp file that ingestion rewrites whenever it
+changes the index, so every cached result goes stale the moment new vectors land,
+even when ingestion runs in another process.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backend.embedding_cache import normalize_text
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 1024))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", 600))
+INDEX_VERSION_PATH = os.getenv("INDEX_VERSION_PATH", "index_version")
+
+
+def current_index_version(path: str = INDEX_VERSION_PATH) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def bump_index_version(path: str = INDEX_VERSION_PATH):
+    """Mark the index as changed; every cached retrieval result becomes stale."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, path)
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl_seconds: float = RETRIEVAL_CACHE_TTL_SECONDS,
+                 version_path: str = INDEX_VERSION_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_path = version_path
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (stored_at, matches), least recently used first
+        self._version = None
+        self._lock = threading.Lock()
+
+    def key(self, query: str, top_k: int, mode: str) -> tuple:
+        query_hash = hashlib.sha256(normalize_text(query).encode("utf-8")).hexdigest()
+        return query_hash, top_k, mode, current_index_version(self.version_path)
+
+    def get(self, key: tuple):
+        with self._lock:
+            if key[-1] != self._version:
+                # The index changed: drop everything cached against the old version
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = key[-1]
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(match) for match in entry[1]]
+
+    def put(self, key: tuple, matches: list):
+        with self._lock:
+            if key[-1] != self._version:
+                return
+            self._entries[key] = (time.monotonic(), [dict(match) for match in matches])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "index_version": self._version,
+            }
+
+
+# ✅ Shared instance used by the retrieval service
+retrieval_cache = RetrievalCache()
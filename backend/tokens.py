@@ -0,0 +1,51 @@
+# backend/tokens.py
+
+import os
+
+TOKENIZER_MODEL = os.getenv("TOKENIZER_MODEL", "gpt-4o-mini")
+
+_encoding = None
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; None if tiktoken is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            try:
+                _encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, falling back to ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """The longest prefix of `text` within `max_tokens`, cut back to a line or word boundary when possible."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        prefix = text[:max_tokens * 4]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    for boundary in ("\n", " "):
+        cut = prefix.rfind(boundary)
+        if cut > len(prefix) // 2:
+            return prefix[:cut].rstrip()
+    return prefix
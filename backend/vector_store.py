@@ -0,0 +1,305 @@
+# backend/vector_store.py
+
+"""
+Local vector store: a drop-in for the parts of Pinecone's `Index` API this app uses
+(`upsert`, `delete`, `query`, `fetch`, `describe_index_stats`).
+
+Vectors are L2-normalized float32 rows in a memory-mapped file (`vectors.f32`), and
+ids/metadata live in an append-only sidecar log (`meta.jsonl`), so upserts and deletes
+only append. Only ids and each row's log offset stay in memory; metadata (chunk text
+included) is read back from the log for the rows a query or fetch returns. Cosine top-k is one matrix-vector product plus `argpartition`.
+Deleted rows are tombstoned and reclaimed by `compact()`.
+Every read first checks the log's inode and size, so writes from another process
+(the ingestion script) show up without a restart. Only the new log lines are read
+unless the log was rewritten.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+
+import numpy as np
+
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", "vector_store")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 1536))
+COMPACT_DEAD_FRACTION = 0.3
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` highest scores, best first, via argpartition."""
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorStore:
+    def __init__(self, path: str = LOCAL_VECTOR_STORE_DIR, dimension: int = EMBEDDING_DIMENSION):
+        self.path = path
+        self.dimension = dimension
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._meta_path = os.path.join(path, "meta.jsonl")
+        self._lock = threading.RLock()
+        self._log = None
+        self._load()
+
+    # --- persistence ---------------------------------------------------------
+
+    def _load(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._ids, self._row_of = [], {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._offsets = np.zeros(0, dtype=np.int64)  # byte offset of each row's log line
+        self._log_generation, self._log_size = self._meta_generation(), 0
+        self._open_log()
+        if self._log is not None:
+            self._read_log()
+
+        # Rows are written to the vector file before their log line, so trust the log's row count
+        self._check_vectors()
+        self._map(len(self._ids))
+
+    def _read_log(self) -> tuple:
+        """Apply the log lines appended since the last read. Returns (first new row, rows deleted or replaced)."""
+        first_row, dead, offsets = len(self._ids), [], []
+        self._log.seek(self._log_size)
+        for line in self._log:
+            if not line.endswith(b"\n"):
+                break  # a line still being written, or torn by an interrupted write
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if "deleted" in entry:
+                for vector_id in entry["deleted"]:
+                    row = self._row_of.pop(vector_id, None)
+                    if row is not None:
+                        dead.append(row)
+            else:
+                previous = self._row_of.get(entry["id"])
+                if previous is not None:
+                    dead.append(previous)
+                self._row_of[entry["id"]] = len(self._ids)
+                self._ids.append(entry["id"])
+                offsets.append(self._log_size)
+            self._log_size += len(line)
+        self._alive = np.concatenate([self._alive, np.ones(len(self._ids) - first_row, dtype=bool)])
+        self._alive[dead] = False
+        self._offsets = np.concatenate([self._offsets, np.array(offsets, dtype=np.int64)])
+        return first_row, dead
+
+    def _open_log(self):
+        # The handle pins the log's inode, so offsets stay valid even if another process compacts
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self._meta_path, "rb") if self._log_generation else None
+
+    def _read_metadata(self, rows) -> list:
+        """Metadata of `rows`, read back from the log."""
+        metadata = []
+        for row in rows:
+            self._log.seek(int(self._offsets[row]))
+            metadata.append(json.loads(self._log.readline()).get("metadata", {}))
+        return metadata
+
+    def _check_vectors(self):
+        rows_on_disk = os.path.getsize(self._vectors_path) // (4 * self.dimension) if os.path.exists(self._vectors_path) else 0
+        if rows_on_disk < len(self._ids):
+            raise ValueError(f"Vector file in {self.path} is shorter than its metadata log; the store is corrupt.")
+
+    def _refresh(self):
+        """Pick up what another process (e.g. the ingestion script) wrote since this one last read the log."""
+        generation = self._meta_generation()
+        size = os.path.getsize(self._meta_path) if generation else 0
+        if generation != self._log_generation or size < self._log_size:
+            # compact() or delete_all elsewhere: row numbers changed, so start over
+            self._load()
+            self._on_reload()
+            logging.info(f"✅ Reloaded local vector store: {int(self._alive.sum())} vectors")
+        elif size > self._log_size:
+            first_row, dead = self._read_log()
+            self._check_vectors()
+            self._map(len(self._ids))
+            if len(self._ids) > first_row:
+                self._on_upsert(first_row, np.asarray(self._matrix[first_row:]))
+            if dead:
+                self._on_delete(dead)
+
+    def _map(self, rows: int):
+        self._matrix = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            if rows else np.empty((0, self.dimension), dtype=np.float32)
+        )
+
+    def _meta_generation(self) -> int:
+        # compact() replaces meta.jsonl, so its inode tells whether saved row numbers still apply
+        return os.stat(self._meta_path).st_ino if os.path.exists(self._meta_path) else 0
+
+    def _append_log(self, entries: list) -> list:
+        """Append entries to the log. Returns the byte offset of each line."""
+        lines = [(json.dumps(entry) + "\n").encode("utf-8") for entry in entries]
+        with open(self._meta_path, "ab") as f:
+            start = f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+        offsets = (start + np.cumsum([0] + [len(line) for line in lines[:-1]])).tolist()
+        # Our own lines are already applied; skip them on the next refresh
+        if not self._log_generation:
+            self._log_generation = self._meta_generation()
+            self._open_log()
+        self._log_size = start + sum(len(line) for line in lines)
+        return offsets
+
+    # --- Pinecone-compatible API ---------------------------------------------
+
+    def upsert(self, vectors: list, namespace: str = None):
+        """Insert or replace [{"id", "values", "metadata"}] (or (id, values, metadata) tuples)."""
+        records = [v if isinstance(v, dict) else {"id": v[0], "values": v[1], "metadata": v[2] if len(v) > 2 else {}}
+                   for v in vectors]
+        if not records:
+            return {"upserted_count": 0}
+        matrix = normalize_rows([r["values"] for r in records])
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {matrix.shape[1]}.")
+
+        with self._lock:
+            self._refresh()
+            # Vectors first, then the log line that makes them visible
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                f.seek(len(self._ids) * 4 * self.dimension)
+                f.write(matrix.tobytes())
+            offsets = self._append_log([{"id": r["id"], "metadata": r.get("metadata", {})} for r in records])
+
+            first_row = len(self._ids)
+            self._alive = np.concatenate([self._alive, np.ones(len(records), dtype=bool)])
+            self._offsets = np.concatenate([self._offsets, np.array(offsets, dtype=np.int64)])
+            for offset, r in enumerate(records):
+                previous = self._row_of.get(r["id"])
+                if previous is not None:
+                    self._alive[previous] = False
+                self._row_of[r["id"]] = first_row + offset
+                self._ids.append(r["id"])
+            self._map(len(self._ids))
+            self._on_upsert(first_row, matrix)
+        return {"upserted_count": len(records)}
+
+    def delete(self, ids: list = None, delete_all: bool = False, namespace: str = None):
+        with self._lock:
+            if delete_all:
+                if os.path.exists(self._vectors_path):
+                    os.remove(self._vectors_path)
+                # An empty log under a new inode, so other processes see the reset instead of a shorter file
+                tmp_meta = self._meta_path + ".tmp"
+                open(tmp_meta, "w").close()
+                os.replace(tmp_meta, self._meta_path)
+                self._load()
+                self._on_reset()
+                return {}
+            self._refresh()
+            rows = [self._row_of.pop(i) for i in ids or [] if i in self._row_of]
+            if rows:
+                self._append_log([{"deleted": [self._ids[row] for row in rows]}])
+                self._alive[rows] = False
+                self._on_delete(rows)
+            if len(self._ids) and 1 - self._alive.mean() > COMPACT_DEAD_FRACTION:
+                self.compact()
+        return {}
+
+    def query(self, vector: list, top_k: int = 3, include_metadata: bool = True, include_values: bool = False,
+              namespace: str = None, **kwargs):
+        """Cosine top-k. Returns {"matches": [{"id", "score", "metadata"[, "values"]}]}."""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32)[None, :])[0]
+        with self._lock:
+            self._refresh()
+            rows, scores = self._search(query, top_k)
+            metadata = self._read_metadata(rows) if include_metadata else [None] * len(rows)
+            return {"matches": [self._match(row, score, meta, include_values)
+                                for row, score, meta in zip(rows, scores, metadata)]}
+
+    def fetch(self, ids: list, namespace: str = None) -> dict:
+        """{"vectors": {id: {"id", "values", "metadata"}}} for the ids that exist."""
+        with self._lock:
+            self._refresh()
+            found = [i for i in ids if i in self._row_of]
+            rows = [self._row_of[i] for i in found]
+            return {"vectors": {
+                i: {"id": i, "values": self._matrix[row].tolist(), "metadata": metadata}
+                for i, row, metadata in zip(found, rows, self._read_metadata(rows))
+            }}
+
+    def describe_index_stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {"dimension": self.dimension, "total_vector_count": int(self._alive.sum())}
+
+    def memory_usage(self) -> dict:
+        """Approximate resident bytes of the in-memory bookkeeping (vectors stay in the memmap)."""
+        with self._lock:
+            return {
+                "ids": sys.getsizeof(self._ids) + sum(sys.getsizeof(i) for i in self._ids),
+                "id_lookup": sys.getsizeof(self._row_of),
+                "alive": self._alive.nbytes,
+                "metadata_offsets": self._offsets.nbytes,
+            }
+
+    # --- search / maintenance ------------------------------------------------
+
+    def _search(self, query: np.ndarray, top_k: int):
+        """Exact cosine search over live rows. Returns (rows, scores)."""
+        if not len(self._ids):
+            return [], []
+        scores = self._matrix @ query
+        scores[~self._alive] = -np.inf
+        best = top_k_indices(scores, min(top_k, int(self._alive.sum())))
+        return best.tolist(), scores[best].tolist()
+
+    def _match(self, row: int, score: float, metadata, include_values: bool) -> dict:
+        match = {"id": self._ids[row], "score": float(score)}
+        if metadata is not None:
+            match["metadata"] = metadata
+        if include_values:
+            match["values"] = self._matrix[row].tolist()
+        return match
+
+    def compact(self):
+        """Rewrite the vector file and log without tombstoned rows."""
+        with self._lock:
+            keep = np.flatnonzero(self._alive)
+            tmp_vectors, tmp_meta = self._vectors_path + ".tmp", self._meta_path + ".tmp"
+            with open(tmp_vectors, "wb") as f:
+                for start in range(0, len(keep), 10000):
+                    f.write(np.ascontiguousarray(self._matrix[keep[start:start + 10000]]).tobytes())
+            with open(tmp_meta, "wb") as f:
+                for row in keep:
+                    self._log.seek(int(self._offsets[row]))
+                    f.write(self._log.readline())
+            self._matrix = None
+            self._log.close()
+            self._log = None
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_meta, self._meta_path)
+            self._load()
+            self._on_reset()
+            logging.info(f"🧹 Compacted local vector store to {len(keep)} vectors")
+
+    # Hooks for index structures layered on top of the exact store
+    def _on_upsert(self, first_row: int, matrix: np.ndarray):
+        pass
+
+    def _on_delete(self, rows: list):
+        pass
+
+    def _on_reset(self):
+        pass
+
+    def _on_reload(self):
+        # Another process rewrote the store; by default treat it like a local reset
+        self._on_reset()
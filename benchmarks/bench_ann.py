@@ -0,0 +1,82 @@
+# benchmarks/bench_ann.py
+
+"""
+Recall@k vs. QPS for the IVF index against exact search on a synthetic,
+clustered corpus; also checks the saved index reloads identically.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ann [vectors] [dimension] [queries]
+"""
+
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.ann_index import IVFVectorStore
+from backend.vector_store import LocalVectorStore, normalize_rows
+
+TOP_K = 10
+NPROBES = (1, 2, 4, 8, 16, 32, 64)
+UPSERT_BATCH = 5000
+
+
+def make_corpus(vectors: int, dimension: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Gaussian blobs around random centres, roughly like topic clusters of proposal chunks."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, vectors)
+    return centres[labels] + 0.6 * rng.standard_normal((vectors, dimension)).astype(np.float32)
+
+
+def load(store, corpus: np.ndarray, text: str = ""):
+    metadata = {"text": text} if text else {}
+    for start in range(0, len(corpus), UPSERT_BATCH):
+        batch = corpus[start:start + UPSERT_BATCH]
+        store.upsert([{"id": f"v{start + i}", "values": row, "metadata": metadata} for i, row in enumerate(batch)])
+
+
+def run_queries(store, queries: np.ndarray, top_k: int = TOP_K):
+    started = time.perf_counter()
+    results = [[m["id"] for m in store.query(vector=q, top_k=top_k, include_metadata=False)["matches"]] for q in queries]
+    return results, len(queries) / (time.perf_counter() - started)
+
+
+def recall_at_k(results: list, truth: list) -> float:
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main(vectors: int = 200000, dimension: int = 256, queries: int = 200):
+    corpus = make_corpus(vectors, dimension)
+    rng = np.random.default_rng(1)
+    query_vectors = normalize_rows(corpus[rng.choice(vectors, queries, replace=False)]
+                                   + 0.3 * rng.standard_normal((queries, dimension)).astype(np.float32))
+
+    with tempfile.TemporaryDirectory() as exact_dir, tempfile.TemporaryDirectory() as ivf_dir:
+        exact = LocalVectorStore(exact_dir, dimension)
+        load(exact, corpus)
+        truth, exact_qps = run_queries(exact, query_vectors)
+
+        started = time.perf_counter()
+        ivf = IVFVectorStore(ivf_dir, dimension, min_train_vectors=vectors)
+        load(ivf, corpus)
+        build_seconds = time.perf_counter() - started
+
+        print(f"vectors: {vectors}  dimension: {dimension}  lists: {len(ivf._centroids)}  build: {build_seconds:.1f}s")
+        print(f"{'search':<12} {'recall@' + str(TOP_K):>10} {'QPS':>10}")
+        print(f"{'exact':<12} {1.0:>10.3f} {exact_qps:>10.0f}")
+        for nprobe in NPROBES:
+            ivf.nprobe = nprobe
+            results, qps = run_queries(ivf, query_vectors)
+            print(f"{'nprobe=' + str(nprobe):<12} {recall_at_k(results, truth):>10.3f} {qps:>10.0f}")
+
+        # Reload from disk and check the saved index answers the same way
+        ivf.save()
+        reloaded = IVFVectorStore(ivf_dir, dimension, nprobe=ivf.nprobe)
+        assert run_queries(reloaded, query_vectors[:10])[0] == run_queries(ivf, query_vectors[:10])[0]
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
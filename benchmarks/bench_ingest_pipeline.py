@@ -0,0 +1,114 @@
+# benchmarks/bench_ingest_pipeline.py
+
+"""
+Exercise the streaming ingestion pipeline (`stream_ingest`, as used by
+`backend.ingest`) against a local stand-in embedding service (fixed latency per
+request, random 429s) and an in-memory fake index. Each document is a job whose
+`load()` returns its chunks, like an extracted and chunked PDF.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ingest_pipeline [docs] [chunks_per_doc]
+"""
+
+import hashlib
+import random
+import sys
+import threading
+import time
+
+from backend import ingest_pipeline
+from backend.ingest_pipeline import stream_ingest
+
+DIMENSION = 1536
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class StandInEmbeddings:
+    """Deterministic fake embedding service with per-request latency and a 429 rate."""
+
+    def __init__(self, latency: float = 0.05, rate_limit_probability: float = 0.05, dimension: int = DIMENSION):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.dimension = dimension
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: list) -> list:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        if random.random() < self.rate_limit_probability:
+            raise RateLimitError("429 Too Many Requests")
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+            rng = random.Random(seed)
+            vectors.append([rng.uniform(-1, 1) for _ in range(self.dimension)])
+        return vectors
+
+
+class FakeIndex:
+    """In-memory stand-in for a Pinecone Index."""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.vectors = {}
+        self.upserts = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: list, namespace: str = None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.upserts += 1
+            for v in vectors:
+                self.vectors[v["id"]] = v
+
+    def delete(self, ids: list = None, delete_all: bool = False, namespace: str = None):
+        with self._lock:
+            if delete_all:
+                self.vectors.clear()
+            for i in ids or []:
+                self.vectors.pop(i, None)
+
+
+def make_records(doc: int, chunks_per_doc: int) -> list:
+    words = "proposal pricing timeline deliverable integration security analytics support".split()
+    return [
+        {"id": f"doc{doc}-{c}", "text": " ".join(random.choice(words) for _ in range(250)),
+         "metadata": {"source": f"doc{doc}.pdf", "chunk_index": c}}
+        for c in range(chunks_per_doc)
+    ]
+
+
+def make_jobs(docs: int, chunks_per_doc: int):
+    for d in range(docs):
+        yield {"name": f"doc{d}.pdf", "load": lambda d=d: make_records(d, chunks_per_doc)}
+
+
+def main(docs: int = 200, chunks_per_doc: int = 20):
+    random.seed(0)
+    ingest_pipeline.BACKOFF_BASE_SECONDS = 0.05  # keep simulated 429s cheap
+    service = StandInEmbeddings()
+    index = FakeIndex()
+    done = []
+
+    stats = stream_ingest(make_jobs(docs, chunks_per_doc), service.embed_documents, index, done.append)
+    assert len(index.vectors) == docs * chunks_per_doc, "every chunk should be upserted exactly once"
+    assert len(done) == docs, "every file should be checkpointed once"
+
+    print(f"docs:               {stats['docs']}")
+    print(f"chunks:             {stats['chunks']}")
+    print(f"embed requests:     {stats['embed_requests']} ({service.requests} incl. rate-limited)")
+    print(f"429 retries:        {stats['rate_limit_retries']}")
+    print(f"upsert requests:    {index.upserts}")
+    print(f"seconds:            {stats['seconds']}")
+    print(f"docs/sec:           {stats['docs_per_sec']}")
+    print(f"chunks/sec:         {stats['chunks_per_sec']}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
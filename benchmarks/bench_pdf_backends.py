@@ -0,0 +1,84 @@
+# benchmarks/bench_pdf_backends.py
+
+"""
+Benchmark every PDF extraction backend over docs/, past_rfps/ and user_rfp.pdf.
+
+Each backend runs in a fresh process so its peak RSS is measured in isolation.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_pdf_backends [pdf_or_dir ...]
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+from backend.pdf_backends import BACKENDS, extract_pdf_pages, load_pdf
+
+DEFAULT_SOURCES = ["docs", "past_rfps", "user_rfp.pdf"]
+
+
+def discover_pdfs(sources: list) -> list:
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths += sorted(
+                os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(".pdf")
+            )
+        elif os.path.isfile(source):
+            paths.append(source)
+    return paths
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_backend(backend: str, paths: list) -> dict:
+    pages = 0
+    chosen = {}
+    start = time.perf_counter()
+    for path in paths:
+        # Named backends are timed on their own; "auto" includes OCR of pages without a text layer
+        result = extract_pdf_pages(load_pdf(path), backend=backend, ocr=backend == "auto")
+        pages += len(result["pages"])
+        chosen[os.path.basename(path)] = f"{result['backend']} ({result['quality']})"
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "seconds": elapsed, "peak_rss_mb": _peak_rss_mb(), "chosen": chosen}
+
+
+def main(sources: list):
+    paths = discover_pdfs(sources)
+    if not paths:
+        print("No PDFs found.")
+        return
+
+    print(f"📄 {len(paths)} PDFs: {', '.join(paths)}\n")
+    print(f"{'backend':<12} {'pages':>6} {'seconds':>9} {'pages/sec':>10} {'peak RSS MB':>12}")
+
+    ctx = multiprocessing.get_context("spawn")
+    auto_choices = {}
+    for backend in (*BACKENDS, "auto"):
+        with ctx.Pool(1) as pool:
+            try:
+                stats = pool.apply(_run_backend, (backend, paths))
+            except Exception as e:
+                print(f"{backend:<12} failed: {e}")
+                continue
+        rate = stats["pages"] / stats["seconds"] if stats["seconds"] else float("inf")
+        print(f"{backend:<12} {stats['pages']:>6} {stats['seconds']:>9.2f} {rate:>10.1f} {stats['peak_rss_mb']:>12.1f}")
+        if backend == "auto":
+            auto_choices = stats["chosen"]
+
+    if auto_choices:
+        print("\nauto picked:")
+        for name, choice in auto_choices.items():
+            print(f"  {name:<30} {choice}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_SOURCES)
@@ -0,0 +1,68 @@
+# benchmarks/bench_quantization.py
+
+"""
+Memory vs. recall for the quantized local store: code bytes/vector, total resident
+bytes/vector (codes plus ids, id lookup and log offsets), recall@k against exact
+float32 search (with and without float32 re-scoring) and QPS per codec. Every
+vector carries a chunk-sized text in its metadata, as ingestion stores it.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_quantization [vectors] [dimension] [queries]
+"""
+
+import sys
+import tempfile
+
+import numpy as np
+
+from backend import quantization
+from backend.quantization import QuantizedVectorStore
+from benchmarks.bench_ann import load, make_corpus, recall_at_k, run_queries
+from backend.vector_store import LocalVectorStore, normalize_rows
+
+TOP_K = 3  # what retrieve_similar_docs asks for
+CODECS = ("int8", "pq")
+CHUNK_TEXT = "lorem ipsum " * 170  # ~2 KB, a typical ingested chunk
+
+
+def resident_per_vector(store, code_bytes: int) -> float:
+    usage = store.memory_usage()
+    usage.setdefault("codes", code_bytes * len(store._ids))
+    return sum(usage.values()) / max(len(store._ids), 1)
+
+
+def main(vectors: int = 50000, dimension: int = 1536, queries: int = 200):
+    quantization.PQ_MIN_TRAIN_VECTORS = min(quantization.PQ_MIN_TRAIN_VECTORS, vectors)
+    corpus = make_corpus(vectors, dimension)
+    rng = np.random.default_rng(1)
+    query_vectors = normalize_rows(corpus[rng.choice(vectors, queries, replace=False)]
+                                   + 0.3 * rng.standard_normal((queries, dimension)).astype(np.float32))
+
+    with tempfile.TemporaryDirectory() as exact_dir:
+        exact = LocalVectorStore(exact_dir, dimension)
+        load(exact, corpus, CHUNK_TEXT)
+        truth, exact_qps = run_queries(exact, query_vectors, TOP_K)
+        # exact search scans the whole float32 matrix, so all of it ends up resident
+        exact_resident = resident_per_vector(exact, 4 * dimension)
+
+        print(f"vectors: {vectors}  dimension: {dimension}  top_k: {TOP_K}")
+        print(f"{'codec':<9} {'code B/vec':>10} {'total B/vec':>12} {'vs f32':>7} "
+              f"{'recall':>8} {'no rerank':>10} {'QPS':>8}")
+        print(f"{'float32':<9} {4 * dimension:>10} {exact_resident:>12.0f} {'1x':>7} "
+              f"{1.0:>8.3f} {1.0:>10.3f} {exact_qps:>8.0f}")
+        for codec in CODECS:
+            with tempfile.TemporaryDirectory() as store_dir:
+                store = QuantizedVectorStore(store_dir, dimension, quantization=codec)
+                load(store, corpus, CHUNK_TEXT)
+                results, qps = run_queries(store, query_vectors, TOP_K)
+                store.rerank_candidates = TOP_K  # approximate ranking alone
+                approx, _ = run_queries(store, query_vectors, TOP_K)
+                resident = resident_per_vector(store, store.bytes_per_vector)
+                ratio = exact_resident / resident
+                print(f"{codec:<9} {store.bytes_per_vector:>10} {resident:>12.0f} {ratio:>6.1f}x "
+                      f"{recall_at_k(results, truth):>8.3f} {recall_at_k(approx, truth):>10.3f} {qps:>8.0f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
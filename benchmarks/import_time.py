@@ -0,0 +1,63 @@
+# benchmarks/import_time.py
+
+"""
+Check how long `import app` takes in a fresh interpreter against a budget.
+
+Usage (from the repo root):
+    python -m benchmarks.import_time [module] [--budget-ms N]
+
+Exits non-zero when the import exceeds the budget (IMPORT_TIME_BUDGET_MS, default 800 ms),
+and lists the slowest imports so regressions are easy to spot.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 800))
+
+
+def measure(module: str) -> tuple:
+    """Return (total_ms, [(cumulative_ms, name)]) from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header line
+        name = fields[2][1:].rstrip()  # nested imports keep their extra indentation
+        entries.append((int(fields[1]) / 1000, name))
+
+    top_level = [ms for ms, name in entries if not name.startswith(" ")]
+    return sum(top_level), sorted(((ms, name.strip()) for ms, name in entries), reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    total_ms, entries = measure(args.module)
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative):")
+    for ms, name in entries[:15]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print("❌ Import time budget exceeded.")
+        sys.exit(1)
+    print("✅ Within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 # embeddings_setup.py
 
-from langchain_openai import OpenAIEmbeddings
+# ✅ Shared, cached embeddings (1536 dimensions, see backend/embeddings_setup.py)
+from backend.embeddings_setup import EMBEDDING_MODEL
 
-# ✅ Ensure this matches Pinecone's 1536 dimensions
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+
+def __getattr__(name):
+    if name == "embeddings":
+        from backend.providers import get_embeddings
+
+        return get_embeddings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,51 @@
 import streamlit as st
 import requests
 from fpdf import FPDF
+import json
 import time
 
 # FastAPI Backend URL
 API_URL = "http://127.0.0.1:8000"
+STREAM_TIMEOUT_SECONDS = 300
+
+
+def stream_ndjson(path: str, **kwargs):
+    """POST to a streaming endpoint and yield its NDJSON records as they arrive; errors become {"error": ...}."""
+    try:
+        with requests.post(f"{API_URL}{path}", stream=True, timeout=STREAM_TIMEOUT_SECONDS, **kwargs) as response:
+            if response.status_code != 200:
+                yield {"error": response.text}
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except requests.RequestException as e:
+        yield {"error": str(e)}
+
+
+def fetch_json(path: str) -> dict:
+    """GET a JSON endpoint; errors become {"error": ...}."""
+    try:
+        response = requests.get(f"{API_URL}{path}", timeout=STREAM_TIMEOUT_SECONDS)
+    except requests.RequestException as e:
+        return {"error": str(e)}
+    if response.status_code != 200:
+        return {"error": response.text}
+    return response.json()
+
+
+def stream_proposal(path: str, placeholder, **kwargs):
+    """Render a proposal stream into `placeholder` token by token; returns (text, final record)."""
+    text = ""
+    for record in stream_ndjson(path, **kwargs):
+        if "token" in record:
+            text += record["token"]
+            placeholder.markdown(text + "▌")
+        else:
+            placeholder.markdown(text)
+            return text.strip(), record
+    return text.strip(), {"error": "Stream ended unexpectedly."}
+
 
 st.title("📄 AI-Powered RFP Automation System")
 
@@ -21,30 +62,38 @@ st.header("📂 Upload an RFP Document")
 if not st.session_state.proposal_generated:
     uploaded_file = st.file_uploader("Upload a PDF or TXT file", type=["pdf", "txt"])
     if uploaded_file:
-        files = {"file": uploaded_file.getvalue()}
-        response = requests.post(f"{API_URL}/rfp/upload_rfp", files=files)
-        if response.status_code == 200:
-            result = response.json()
-            extracted_rfp_text = result["extracted_text"]
-            st.success(f"✅ File Uploaded: {result['filename']}")
-            st.write("📜 **Extracted Text Preview:**", extracted_rfp_text[:500])
-            # Generate the initial proposal
-            proposal_response = requests.post(
-                f"{API_URL}/proposal/generate_proposal",
-                json={"rfp_text": extracted_rfp_text, "retrieved_docs": []}
-            )
-            if proposal_response.status_code == 200:
-                result = proposal_response.json()
-                st.session_state.current_proposal = result["proposal"]
-                st.success("✅ Proposal Generated!")
-                st.write("📌 **Generated Proposal:**", result["proposal"])
-                st.session_state.proposal_generated = True
-                # Store the proposal in the backend
-                requests.post(f"{API_URL}/proposal/store_proposal", json={"proposal": result["proposal"]})
+        files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
+        # Pages are shown as they are extracted, then the proposal is rendered as it is written
+        progress = st.empty()
+        summary = {"error": "No pages extracted."}
+        for record in stream_ndjson("/rfp/upload_rfp_stream", files=files):
+            if "page" in record:
+                progress.write(f"⏳ Extracted page {record['page']} ({record['source']})")
             else:
-                st.error(f"❌ Error generating proposal: {proposal_response.text}")
+                summary = record
+        progress.empty()
+        # ✅ The server assembles the text (OCR markers included) the same way /upload_rfp does;
+        # the stream only carries its digest, so the full text is fetched once here
+        if not summary.get("error"):
+            summary = {**summary, **fetch_json(f"/rfp/parsed/{summary['sha256']}")}
+        rfp_text = summary.get("text", "")
+
+        if summary.get("error") or not rfp_text.strip():
+            st.error(f"❌ File upload failed: {summary.get('error') or 'no text extracted'}")
         else:
-            st.error("❌ File upload failed.")
+            st.success(f"✅ File Uploaded. {summary['pages']} pages extracted.")
+            st.write("📜 **Extracted Text Preview:**", rfp_text[:500])
+            st.write("📌 **Generated Proposal:**")
+            proposal, result = stream_proposal(
+                "/proposal/generate_proposal_stream", st.empty(), json={"rfp_text": rfp_text}
+            )
+            if result.get("error"):
+                st.error(f"❌ Error generating proposal: {result['error']}")
+            else:
+                # The backend stores the proposal once the stream completes
+                st.session_state.current_proposal = proposal
+                st.session_state.proposal_generated = True
+                st.success(f"✅ Proposal Generated! (first token after {(result['first_token_ms'] or 0) / 1000:.1f}s)")
 else:
     st.write("Using previously generated proposal:")
     st.write(st.session_state.current_proposal)
@@ -55,24 +104,19 @@ user_feedback = st.text_area("Your Feedback", height=100)
 
 if st.button("Refine Proposal"):
     if user_feedback:
-        refine_response = requests.post(
-            f"{API_URL}/proposal/refine_proposal",
-            json={"user_feedback": user_feedback}
+        st.write("📌 **Refined Proposal:**")
+        refined_proposal, result = stream_proposal(
+            "/proposal/refine_proposal_stream", st.empty(), json={"user_feedback": user_feedback}
         )
-        if refine_response.status_code == 200:
-            result = refine_response.json()
-            refined_proposal = result.get("refined_proposal", "")
-            if refined_proposal:
-                st.session_state.current_proposal = refined_proposal
-                st.session_state.proposal_refined = True
-                st.success("✅ Proposal Refined!")
-                st.write("📌 **Refined Proposal:**", refined_proposal)
-                # Update the backend with the refined proposal
-                requests.post(f"{API_URL}/proposal/store_proposal", json={"proposal": refined_proposal})
-            else:
-                st.warning("⚠️ No changes were made.")
+        if result.get("error"):
+            st.error(f"❌ Error refining proposal: {result['error']}")
+        elif refined_proposal:
+            # The backend stores the refined proposal once the stream completes
+            st.session_state.current_proposal = refined_proposal
+            st.session_state.proposal_refined = True
+            st.success("✅ Proposal Refined!")
         else:
-            st.error(f"❌ Error refining proposal: {refine_response.text}")
+            st.warning("⚠️ No changes were made.")
 
 # --- Step 3: Export the Latest Proposal as PDF ---
 st.header("📤 Finalize & Export")
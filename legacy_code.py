@@ -22,7 +22,7 @@ from embeddings_setup import embeddings
 
 # PDF generation
 from fpdf import FPDF
-import PyPDF2
+from backend.pdf_backends import extract_pdf_text
 
 # Logging
 import logging
@@ -187,13 +187,7 @@ def parse_rfp_pdf(pdf_path: str) -> str:
     Returns the extracted text or an error message.
     """
     try:
-        text = ""
-        with open(pdf_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        text = extract_pdf_text(pdf_path)
         if not text.strip():
             logging.warning(f"No readable text found in PDF: {pdf_path}")
             return "No readable text found in the PDF."
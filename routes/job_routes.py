@@ -0,0 +1,66 @@
+# routes/job_routes.py
+
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from backend.job_queue import submit_job, get_job, cancel_job, SUCCEEDED, FINISHED
+from routes.rfp_routes import save_upload
+import os
+
+job_router = APIRouter()
+
+
+def _status(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "filename": job["filename"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+def _get_or_404(job_id: str) -> dict:
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+
+@job_router.post("/submit")
+async def submit(file: UploadFile = File(...)):
+    """Upload an RFP and queue it for parse → retrieve → proposal generation."""
+    file_path, digest = await save_upload(file)
+    filename = os.path.basename(file.filename or "") or os.path.basename(file_path)
+    job_id = submit_job(file_path, filename=filename, sha256=digest)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@job_router.get("/{job_id}")
+def job_status(job_id: str):
+    """Current status and stage of a job."""
+    return _status(_get_or_404(job_id))
+
+
+@job_router.get("/{job_id}/result")
+def job_result(job_id: str):
+    """Extracted RFP text, retrieved documents and generated proposal of a finished job."""
+    job = _get_or_404(job_id)
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is still {job['status']} (stage: {job['stage']}).")
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} {job['status']}: {job['error'] or 'no result'}")
+    return {
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "extracted_text": job["rfp_text"],
+        "retrieved_docs": job["retrieved_docs"],
+        "proposal": job["proposal"],
+    }
+
+
+@job_router.post("/{job_id}/cancel")
+def job_cancel(job_id: str):
+    """Cancel a queued job, or stop a running job before its next stage."""
+    _get_or_404(job_id)
+    return _status(cancel_job(job_id))
@@ -1,43 +1,38 @@
 # routes/proposal_routes.py
 
+import asyncio
+import json
+import time
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from backend.llm_utils import expand_rfp, refine_proposal, conversation_memory
-from backend.pinecone_utils import retrieve_similar_docs
-from langchain_openai import ChatOpenAI
-from dotenv import load_dotenv
-load_dotenv()
-import os
+from backend.llm_utils import (aexpand_rfp, arefine_proposal, astream_expand_rfp, astream_refine_proposal,
+                               conversation_memory, LLM_TIMEOUT_SECONDS)
+from backend.pinecone_utils import aretrieve_similar_docs
+from backend.retrieval import PROPOSAL_RETRIEVAL_MODE
 
 proposal_router = APIRouter()
 
-# ✅ Initialize GPT-4o
-llm = ChatOpenAI(
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    model_name="gpt-4o-mini",
-    temperature=0.0
-)
-
 # ✅ Define request model
 class RFPRequest(BaseModel):
     rfp_text: str
     retrieved_docs: list = []
 
 @proposal_router.post("/generate_proposal")
-def generate_proposal(request: RFPRequest):
+async def generate_proposal(request: RFPRequest):
     """ Generate a proposal in response to an RFP while leveraging retrieved documents for RAG. """
     try:
         rfp_text = request.rfp_text.strip()
         if not rfp_text:
             raise HTTPException(status_code=400, detail="RFP text cannot be empty.")
 
-        # ✅ Step 1: Retrieve Similar Proposals from Pinecone
-        retrieved_docs = retrieve_similar_docs(rfp_text, top_k=3)
+        # ✅ Step 1: Retrieve Similar Proposals from Pinecone (one query per RFP section, MMR-merged)
+        retrieved_docs = await aretrieve_similar_docs(rfp_text, top_k=3, mode=PROPOSAL_RETRIEVAL_MODE)
 
         print("\n🔍 **Retrieved Documents for RAG:**\n", retrieved_docs)  # ✅ Debugging
 
         # ✅ Step 2: Generate a Proposal Based on Full RFP & Retrieved Context
-        proposal = expand_rfp(rfp_text, retrieved_docs)
+        proposal = await aexpand_rfp(rfp_text, retrieved_docs)
 
         conversation_memory["latest_proposal"] = proposal   
         
@@ -46,6 +41,10 @@ def generate_proposal(request: RFPRequest):
             "retrieved_docs": retrieved_docs  # ✅ Debugging output
         }
 
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Proposal generation timed out after {LLM_TIMEOUT_SECONDS:.0f}s.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating proposal: {str(e)}")
 
@@ -54,7 +53,7 @@ class RefineRequest(BaseModel):
     user_feedback: str
     
 @proposal_router.post("/refine_proposal")
-def refine_proposal_endpoint(refine_data: RefineRequest):
+async def refine_proposal_endpoint(refine_data: RefineRequest):
     """Refine the latest proposal based on user feedback."""
     try:
         user_feedback = refine_data.user_feedback
@@ -65,16 +64,87 @@ def refine_proposal_endpoint(refine_data: RefineRequest):
         if not current_proposal:
             raise HTTPException(status_code=400, detail="No existing proposal to refine.")
 
-        refined_proposal = refine_proposal(current_proposal, user_feedback)
+        refined_proposal = await arefine_proposal(current_proposal, user_feedback)
 
         # ✅ Store refined proposal in memory
         conversation_memory["latest_proposal"] = refined_proposal["refined_proposal"]
 
         return {"refined_proposal": refined_proposal["refined_proposal"]}
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Proposal refinement timed out after {LLM_TIMEOUT_SECONDS:.0f}s.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refining proposal: {str(e)}")
 
 
+async def _stream_proposal(chunks, action: str, summary: dict = None):
+    """NDJSON lines: one per text chunk as the LLM produces it, then a summary line (or an error line)."""
+    started = time.perf_counter()
+    first_token_ms = None
+    parts = []
+    try:
+        async for text in chunks:
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 2)
+            parts.append(text)
+            yield json.dumps({"token": text}) + "\n"
+    except asyncio.TimeoutError:
+        yield json.dumps({"error": f"Proposal {action} timed out after {LLM_TIMEOUT_SECONDS:.0f}s."}) + "\n"
+        return
+    except Exception as e:
+        yield json.dumps({"error": f"Error in proposal {action}: {str(e)}"}) + "\n"
+        return
+
+    # ✅ Store the final text only once the stream completed
+    proposal = "".join(parts).strip()
+    conversation_memory["latest_proposal"] = proposal
+
+    yield json.dumps({
+        "done": True,
+        "chars": len(proposal),
+        "first_token_ms": first_token_ms,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        **(summary or {}),
+    }) + "\n"
+
+
+@proposal_router.post("/generate_proposal_stream")
+async def generate_proposal_stream(request: RFPRequest):
+    """Generate a proposal and stream its text as NDJSON as the LLM produces it."""
+    rfp_text = request.rfp_text.strip()
+    if not rfp_text:
+        raise HTTPException(status_code=400, detail="RFP text cannot be empty.")
+
+    # ✅ Retrieval runs before the stream opens, so its failures are still plain HTTP errors
+    try:
+        retrieved_docs = await aretrieve_similar_docs(rfp_text, top_k=3, mode=PROPOSAL_RETRIEVAL_MODE)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating proposal: {str(e)}")
+
+    return StreamingResponse(
+        _stream_proposal(astream_expand_rfp(rfp_text, retrieved_docs), "generation",
+                         {"retrieved_docs": retrieved_docs}),
+        media_type="application/x-ndjson",
+    )
+
+
+@proposal_router.post("/refine_proposal_stream")
+async def refine_proposal_stream(refine_data: RefineRequest):
+    """Refine the latest proposal based on user feedback and stream the refined text as NDJSON."""
+    if not refine_data.user_feedback:
+        raise HTTPException(status_code=400, detail="User feedback is required.")
+
+    current_proposal = conversation_memory.get("latest_proposal", "")
+    if not current_proposal:
+        raise HTTPException(status_code=400, detail="No existing proposal to refine.")
+
+    return StreamingResponse(
+        _stream_proposal(astream_refine_proposal(current_proposal, refine_data.user_feedback), "refinement"),
+        media_type="application/x-ndjson",
+    )
+
+
 @proposal_router.get("/get_latest_proposal")
 def get_latest_proposal():
     """Retrieve the latest refined proposal from memory."""
@@ -1,17 +1,25 @@
 # routes/retrieval_routes.py
 
+import os
 from fastapi import APIRouter, HTTPException, Query
-from backend.pinecone_utils import retrieve_similar_docs
+from pydantic import BaseModel
+from backend.pinecone_utils import retrieve_similar_docs, retrieve_similar_docs_batch
+from backend.retrieval import RETRIEVAL_MODE, RETRIEVAL_MODES
+
+RETRIEVAL_BATCH_MAX_QUERIES = int(os.getenv("RETRIEVAL_BATCH_MAX_QUERIES", 500))
 
 retrieval_router = APIRouter()
 
 @retrieval_router.get("/retrieve_docs")
-def retrieve_documents(query: str = Query(..., description="Search query for document retrieval")):
+def retrieve_documents(
+    query: str = Query(..., description="Search query for document retrieval"),
+    mode: str = Query(RETRIEVAL_MODE, description="Retrieval mode: dense or hybrid (dense + BM25)"),
+):
     """ Retrieve relevant documents from Pinecone based on query """
     try:
         print(f"🔍 Debug: Received Query - {query}")
 
-        retrieved_docs = retrieve_similar_docs(query)
+        retrieved_docs = retrieve_similar_docs(query, mode=mode)
 
         print(f"📄 Debug: Retrieved Docs - {retrieved_docs}")
 
@@ -23,3 +31,33 @@ def retrieve_documents(query: str = Query(..., description="Search query for doc
     except Exception as e:
         print(f"❌ Debug: Retrieval Error - {str(e)}")
         return {"retrieved_docs": [f"Error retrieving documents: {str(e)}"]}
+
+
+class BatchRetrieveRequest(BaseModel):
+    queries: list[str]
+    top_k: int = 3
+    mode: str = RETRIEVAL_MODE
+
+
+@retrieval_router.post("/retrieve_docs_batch")
+def retrieve_documents_batch(request: BatchRetrieveRequest):
+    """ Retrieve documents for many queries in one call (results in input order, per-query errors) """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required.")
+    if len(request.queries) > RETRIEVAL_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {RETRIEVAL_BATCH_MAX_QUERIES} queries per batch.")
+    if request.mode not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown retrieval mode '{request.mode}'.")
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1.")
+
+    print(f"🔍 Debug: Received {len(request.queries)} batch queries")
+    return {"results": retrieve_similar_docs_batch(request.queries, top_k=request.top_k, mode=request.mode)}
+
+
+@retrieval_router.get("/cache_stats")
+def retrieval_cache_stats():
+    """Retrieval result cache hit, miss, expiry and invalidation counters."""
+    from backend.retrieval_cache import retrieval_cache
+
+    return retrieval_cache.stats()
@@ -1,20 +1,185 @@
 # routes/rfp_routes.py
 
-from fastapi import APIRouter, UploadFile, File
-from backend.parse_rfp_pdf import parse_rfp_pdf
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+from backend.parse_cache import parse_rfp_pdf_cached, parse_cache
+from backend.parse_rfp_pdf import iter_rfp_pages
+from concurrent.futures import ThreadPoolExecutor
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import re
+import tempfile
+import time
 
 rfp_router = APIRouter()
 
 UPLOAD_DIR = "uploaded_rfps"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# ✅ Upload limits
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("RFP_MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+
+# ✅ Parsing runs off the event loop on its own executor so it never starves the
+# threadpool that serves the sync /retrieval and /proposal routes
+PARSE_CONCURRENCY = int(os.getenv("RFP_PARSE_CONCURRENCY", 2))
+_parse_executor = ThreadPoolExecutor(max_workers=PARSE_CONCURRENCY, thread_name_prefix="rfp-parse")
+
+
+async def save_upload(file: UploadFile) -> tuple:
+    """
+    Stream an upload to UPLOAD_DIR in bounded chunks, hashing as it goes.
+    The file is stored under its SHA-256 (`<sha256>.pdf`), so concurrent uploads never share
+    a path and a stored file always matches its digest.
+    Returns (file_path, sha256). Raises 413 past MAX_UPLOAD_BYTES.
+    """
+    extension = os.path.splitext(os.path.basename(file.filename or ""))[1].lower() or ".pdf"
+    fd, tmp_path = await run_in_threadpool(tempfile.mkstemp, dir=UPLOAD_DIR, suffix=".part")
+
+    digest = hashlib.sha256()
+    size = 0
+    f = os.fdopen(fd, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit.",
+                )
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        f.close()
+        os.remove(tmp_path)
+        raise
+    f.close()
+
+    # Same bytes, same name: replacing an existing copy is a no-op for anyone reading it
+    file_path = os.path.join(UPLOAD_DIR, digest.hexdigest() + extension)
+    os.replace(tmp_path, file_path)
+    return file_path, digest.hexdigest()
+
+
+async def parse_upload(file_path: str, digest: str) -> dict:
+    """Run the (cached) CPU-heavy parse on the parse executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parse_executor, parse_rfp_pdf_cached, file_path, digest)
+
+
 @rfp_router.post("/upload_rfp")
 async def upload_rfp(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    file_path, digest = await save_upload(file)
+
+    # ✅ Same bytes under any filename hit the parse cache
+    result = await parse_upload(file_path, digest)
+    extracted_text = result["text"]
+
+    return {
+        "filename": os.path.basename(file.filename or "") or os.path.basename(file_path),
+        "extracted_text": extracted_text[:500],
+        "cached": result["cached"],
+        "ocr_tokens_saved": sum(page.get("ocr_tokens_saved", 0) for page in result["pages"]),
+    }
+
+
+def _next_page(records, writer, done):
+    """Pull the next page record and spool it to the cache writer, in one executor hop."""
+    record = next(records, done)
+    if writer is not None and record is not done:
+        writer.add(record)
+    return record
+
+
+async def _stream_pages(file_path: str, digest: str):
+    """
+    NDJSON lines: one per page as it is extracted, then a summary line (or an error line).
+    Pages are spooled straight into the parse cache, so memory stays flat however long the
+    document is; the summary's `sha256` fetches the assembled text from /rfp/parsed/<sha256>.
+    """
+    started = time.perf_counter()
+    pages = 0
+    writer = None
+
+    entry = parse_cache.get(digest)
+    if entry is not None:
+        # Entries cached from a whole-document PyMuPDF fallback carry text but no page records
+        records = iter(entry["pages"] or [{
+            "page": 1, "text": entry["text"], "ocr_text": "", "source": "pymupdf",
+            "decision": "text", "extract_ms": 0.0, "ocr_ms": 0.0,
+        }])
+    else:
+        records = iter_rfp_pages(file_path)
+        writer = parse_cache.writer(digest)
+
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            # ✅ Each page is pulled on the parse executor, never on the event loop
+            record = await loop.run_in_executor(_parse_executor, _next_page, records, writer, done)
+            if record is done:
+                break
+            pages += 1
+            yield json.dumps({
+                "page": record["page"],
+                "text": record["text"],
+                "ocr_text": record["ocr_text"],
+                "source": record.get("source", "cache"),
+                "decision": record["decision"],
+                "extract_ms": record["extract_ms"],
+                "ocr_ms": record["ocr_ms"],
+            }) + "\n"
+    except BaseException as e:
+        if writer is not None:
+            writer.abort()
+        if not isinstance(e, Exception):
+            raise  # client went away: stop quietly
+        logging.error(f"❌ Streaming extraction failed on {file_path}: {e}")
+        yield json.dumps({"error": f"Error extracting {os.path.basename(file_path)}: {str(e)}"}) + "\n"
+        return
+
+    # ✅ A streamed parse fills the same cache as /upload_rfp and the job queue
+    if writer is not None and not await loop.run_in_executor(_parse_executor, writer.commit):
+        yield json.dumps({"error": "Unable to process the PDF."}) + "\n"
+        return
+
+    yield json.dumps({
+        "done": True,
+        "pages": pages,
+        "cached": entry is not None,
+        "sha256": digest,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }) + "\n"
+
+
+@rfp_router.post("/upload_rfp_stream")
+async def upload_rfp_stream(file: UploadFile = File(...)):
+    """Upload an RFP and stream each page's text, source and timing as NDJSON as soon as it is extracted."""
+    file_path, digest = await save_upload(file)
+    return StreamingResponse(_stream_pages(file_path, digest), media_type="application/x-ndjson")
+
+
+@rfp_router.get("/parsed/{digest}")
+async def parsed_text(digest: str):
+    """The full extracted text of a parsed upload, by the `sha256` its upload returned."""
+    if not re.fullmatch(r"[0-9a-f]{64}", digest):
+        raise HTTPException(status_code=400, detail="Expected a SHA-256 hex digest.")
+    loop = asyncio.get_running_loop()
+    entry = await loop.run_in_executor(_parse_executor, parse_cache.get, digest)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No parsed RFP for that digest; upload it again.")
+    return {"sha256": digest, "text": entry["text"]}
 
-    extracted_text = parse_rfp_pdf(file_path)
 
-    return {"filename": file.filename, "extracted_text": extracted_text[:500]}
+@rfp_router.get("/cache_stats")
+def cache_stats():
+    """Parse cache hit, miss and eviction counters."""
+    return parse_cache.stats()